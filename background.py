@@ -0,0 +1,213 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_CACHE_DIR = "data/cache/backgrounds"
+FALLBACK_COLOR = (20, 20, 20)
+
+
+class BackgroundRenderer:
+    """Blurred, darkened window background rendered off-thread and cached
+
+    Processed frames are stored as JPEGs keyed by the source file's hash
+    and the target size, so a relaunch at the same window size shows the
+    cached frame without touching the source image. Window resizes are
+    debounced and re-rendered on a single worker thread (latest size
+    wins); the image is cropped to fill the window instead of stretched.
+    """
+
+    def __init__(
+        self,
+        source_path: str,
+        cache_dir: Optional[str] = BACKGROUND_CACHE_DIR,
+        blur: float = 8,
+        brightness: float = 0.32,
+        debounce_ms: int = 250,
+        max_cached: int = 8
+    ):
+        """
+        Initialize renderer
+
+        Args:
+            source_path: Background image (a flat color is used if missing)
+            cache_dir: Directory for processed frames (None = no disk cache)
+            blur: GaussianBlur radius in pixels
+            brightness: Brightness factor (1.0 = unchanged)
+            debounce_ms: Quiet period after the last resize before re-rendering
+            max_cached: Processed frames kept on disk (LRU by mtime)
+        """
+        self.source_path = source_path
+        self.cache_dir = cache_dir
+        self.blur = blur
+        self.brightness = brightness
+        self.debounce_ms = debounce_ms
+        self.max_cached = max(1, max_cached)
+
+        self._source_key: Optional[str] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="background")
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        # Tk state (set by attach)
+        self._root = None
+        self._label = None
+        self._photo = None
+        self._size: Optional[Tuple[int, int]] = None
+        self._pending_job = None
+
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"⚠ Background cache dir unavailable: {e}")
+                self.cache_dir = None
+
+    # ------------------------------------------------------------------
+    # Rendering (any thread)
+    # ------------------------------------------------------------------
+    def source_key(self) -> str:
+        """Content hash of the source image ("none" when missing)"""
+        if self._source_key is None:
+            digest = hashlib.sha1()
+            try:
+                with open(self.source_path, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 16), b""):
+                        digest.update(block)
+                self._source_key = digest.hexdigest()[:16]
+            except OSError:
+                self._source_key = "none"
+        return self._source_key
+
+    def _path_for(self, size: Tuple[int, int]) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"bg_{self.source_key()}_{size[0]}x{size[1]}.jpg")
+
+    def load_cached(self, size: Tuple[int, int]) -> Optional["Image.Image"]:
+        """Processed frame for `size` from disk, or None"""
+        path = self._path_for(size)
+        if not path or not os.path.exists(path):
+            return None
+        from PIL import Image
+
+        try:
+            with Image.open(path) as cached:
+                image = cached.convert("RGB")
+            os.utime(path, None)
+            return image
+        except OSError as e:
+            logger.warning(f"⚠ Corrupt background cache {path}: {e}")
+            return None
+
+    def render(self, size: Tuple[int, int]) -> "Image.Image":
+        """Crop-to-fill, blur and darken the source at `size`, then cache it"""
+        cached = self.load_cached(size)
+        if cached is not None:
+            return cached
+
+        from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+
+        try:
+            with Image.open(self.source_path) as source:
+                image = ImageOps.fit(source.convert("RGB"), size, Image.LANCZOS)
+        except OSError:
+            image = Image.new("RGB", size, FALLBACK_COLOR)
+        image = image.filter(ImageFilter.GaussianBlur(self.blur))
+        image = ImageEnhance.Brightness(image).enhance(self.brightness)
+
+        path = self._path_for(size)
+        if path:
+            tmp_path = f"{path}.tmp"
+            try:
+                image.save(tmp_path, format="JPEG", quality=90)
+                os.replace(tmp_path, path)
+                self._enforce_cache_limit()
+            except OSError as e:
+                logger.warning(f"⚠ Failed to cache background: {e}")
+        return image
+
+    def _enforce_cache_limit(self):
+        """Keep only the most recently used frames"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith("bg_") and name.endswith(".jpg"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_cached:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------
+    # Tk integration (Tk thread)
+    # ------------------------------------------------------------------
+    def attach(self, root, label, size: Tuple[int, int]):
+        """
+        Drive `label`'s image from the window size
+
+        The label keeps its background color until the worker thread has
+        loaded the cached frame for `size` (or rendered a new one), so
+        neither Pillow nor disk I/O delays the first frame.
+        """
+        self._root = root
+        self._label = label
+        self._submit(size)
+
+        root.bind("<Configure>", self._on_configure, add="+")
+
+    def _on_configure(self, event):
+        if event.widget is not self._root:
+            return
+        size = (max(1, event.width), max(1, event.height))
+        if size == self._size:
+            return
+        if self._pending_job is not None:
+            self._root.after_cancel(self._pending_job)
+        self._pending_job = self._root.after(self.debounce_ms, lambda: self._submit(size))
+
+    def _submit(self, size: Tuple[int, int]):
+        self._pending_job = None
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        self._executor.submit(self._render_async, size, generation)
+
+    def _render_async(self, size: Tuple[int, int], generation: int):
+        with self._lock:
+            if generation != self._generation:
+                return
+        try:
+            image = self.render(size)
+        except Exception as e:
+            logger.warning(f"⚠ Background render failed: {e}")
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+        self._root.after(0, lambda: self._show(image, size))
+
+    def _show(self, image: "Image.Image", size: Tuple[int, int]):
+        from PIL import ImageTk
+
+        self._photo = ImageTk.PhotoImage(image)
+        self._label.configure(image=self._photo)
+        self._size = size
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def __repr__(self) -> str:
+        return f"BackgroundRenderer(source={self.source_path!r}, size={self._size})"
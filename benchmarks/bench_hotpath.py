@@ -0,0 +1,189 @@
+"""
+Microbenchmarks for the parse -> dedupe -> select -> export hot path.
+
+Usage:
+    python benchmarks/bench_hotpath.py
+    python benchmarks/bench_hotpath.py --sizes 10 1000 --output out.json
+    python benchmarks/bench_hotpath.py --compare data/benchmarks/hotpath-<old>.json
+
+Results (ops/sec per item and peak traced memory) are written as JSON so
+runs from different commits can be compared with --compare.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cache import SearchCache
+from local_index import LocalIndex
+from models import Playlist
+from recommender import RecommenderEngine
+from resilience import UpstreamGuard
+from ytm_client import YTMusicClient
+
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+OUTPUT_DIR = os.path.join(ROOT, "data", "benchmarks")
+MIN_SECONDS = 0.2
+
+
+def synthetic_item(i: int) -> dict:
+    """ytmusicapi search() result shaped like a real 'song' hit"""
+    return {
+        "resultType": "song",
+        "title": f"Synthetic Song {i} (Official Audio)",
+        "artists": [{"name": f"Artist {i % 997}", "id": f"UC{i % 997:022d}"}],
+        "album": {"name": f"Album {i % 311}", "id": f"MPRE{i % 311}"},
+        "duration": f"{2 + i % 5}:{i % 60:02d}",
+        "duration_seconds": 120 + i % 300,
+        # ~10% of ids repeat so dedupe has real work to do
+        "videoId": f"vid{i if i % 10 else i // 10:08d}",
+        "thumbnails": [
+            {"url": f"https://lh3.googleusercontent.com/{i}=w60-h60", "width": 60, "height": 60},
+            {"url": f"https://lh3.googleusercontent.com/{i}=w120-h120", "width": 120, "height": 120},
+        ],
+        "isExplicit": False,
+    }
+
+
+def _measure(func, size: int, with_memory: bool) -> dict:
+    """Time func (repeated until MIN_SECONDS) and optionally trace peak memory"""
+    gc.collect()
+    loops = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        loops += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            break
+    per_call = elapsed / loops
+
+    peak = None
+    if with_memory:
+        gc.collect()
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "seconds_per_call": per_call,
+        "loops": loops,
+        "ops_per_sec": size / per_call if per_call else float("inf"),
+        "peak_bytes": peak,
+    }
+
+
+def run(sizes, with_memory: bool = True) -> list:
+    client = YTMusicClient(
+        cache=SearchCache(None, enabled=False), client=object(),
+        index=LocalIndex(None), guard=UpstreamGuard.unlimited()
+    )
+    engine = RecommenderEngine(client)
+    tmp_dir = tempfile.mkdtemp(prefix="bench_")
+    results = []
+
+    for size in sizes:
+        items = [synthetic_item(i) for i in range(size)]
+        tracks = [client._parse_track(item) for item in items]
+        unique = engine._deduplicate_tracks(tracks)
+        playlist = Playlist("Benchmark", unique)
+        json_path = os.path.join(tmp_dir, "bench.json")
+        txt_path = os.path.join(tmp_dir, "bench.txt")
+
+        benches = [
+            ("parse_track", lambda: [client._parse_track(item) for item in items]),
+            ("deduplicate_tracks", lambda: engine._deduplicate_tracks(tracks)),
+            ("rank_top_n", lambda: engine.ranker.select(unique, max(1, size // 2), "synthetic song")),
+            ("playlist_clone", playlist.clone),
+            ("export_json", lambda: playlist.export_json(json_path)),
+            ("export_txt", lambda: playlist.export_txt(txt_path)),
+        ]
+
+        for name, func in benches:
+            stats = _measure(func, size, with_memory)
+            stats.update({"bench": name, "size": size})
+            results.append(stats)
+            peak = f"{stats['peak_bytes'] / 1024 / 1024:9.2f} MiB" if stats["peak_bytes"] is not None else "        -"
+            print(f"{name:<20} n={size:<9} {stats['ops_per_sec']:>14,.0f} items/s  peak={peak}")
+
+        del items, tracks, unique, playlist
+        gc.collect()
+
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old_path: str, results: list):
+    """Print ops/sec ratio of this run vs a previous JSON report"""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    baseline = {(r["bench"], r["size"]): r for r in old.get("results", [])}
+
+    print(f"\nComparison vs {old.get('meta', {}).get('commit', old_path)}:")
+    for r in results:
+        prev = baseline.get((r["bench"], r["size"]))
+        if not prev or not prev.get("ops_per_sec"):
+            continue
+        ratio = r["ops_per_sec"] / prev["ops_per_sec"]
+        flag = "  <-- regression" if ratio < 0.9 else ""
+        print(f"{r['bench']:<20} n={r['size']:<9} x{ratio:5.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--output", help="JSON report path (default: data/benchmarks/hotpath-<commit>.json)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc peak measurement")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    commit = _git_commit()
+    results = run(args.sizes, with_memory=not args.no_memory)
+
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(OUTPUT_DIR, f"hotpath-{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved report to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Memory footprint of track storage layouts.
+
+Compares the original @dataclass Track, the slotted Track and the
+columnar TrackTable for N parsed tracks.
+
+Usage:
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --sizes 1000 100000 --output out.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_hotpath import synthetic_item
+from cache import SearchCache
+from local_index import LocalIndex
+from models import Track, TrackTable
+from resilience import UpstreamGuard
+from ytm_client import YTMusicClient
+
+DEFAULT_SIZES = [1_000, 100_000, 500_000]
+
+
+@dataclass
+class LegacyTrack:
+    """The pre-slots Track dataclass, kept here as the baseline"""
+    title: str = ""
+    channel: str = ""
+    duration: str = ""
+    video_id: str = ""
+    playlist_id: str = ""
+    url: str = ""
+    result_type: str = ""
+    thumbnail: Optional[str] = None
+
+
+def _legacy(track: Track) -> LegacyTrack:
+    # Fresh str copies reproduce the old per-instance duplication
+    return LegacyTrack(
+        title=track.title,
+        channel="".join(track.channel),
+        duration=track.duration,
+        video_id=track.video_id,
+        url=f"https://music.youtube.com/watch?v={track.video_id}",
+        result_type="".join(track.result_type),
+        thumbnail=track.thumbnail,
+    )
+
+
+def _traced(build):
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def run(sizes) -> list:
+    client = YTMusicClient(
+        cache=SearchCache(None, enabled=False), client=object(),
+        index=LocalIndex(None), guard=UpstreamGuard.unlimited()
+    )
+    results = []
+
+    for size in sizes:
+        items = [synthetic_item(i) for i in range(size)]
+        parsed = [client._parse_track(item) for item in items]
+        del items
+
+        layouts = [
+            ("dataclass", lambda: [_legacy(t) for t in parsed]),
+            ("slotted", lambda: [t.__copy__() for t in parsed]),
+            ("table", lambda: TrackTable(parsed)),
+        ]
+
+        baseline = None
+        for name, build in layouts:
+            obj, used = _traced(build)
+            del obj
+            if baseline is None:
+                baseline = used
+            results.append({"layout": name, "size": size, "bytes": used, "vs_dataclass": used / baseline})
+            print(f"{name:<10} n={size:<8} {used / 1024 / 1024:9.2f} MiB  ({used / size:7.1f} B/track, x{used / baseline:.2f})")
+
+        del parsed
+        gc.collect()
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--output", help="Optional JSON report path")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = run(args.sizes)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"\nSaved report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Load test for the HTTP service against a local fake YouTube Music backend.
+
+Starts PlaylistServer in-process on a free port with a synthetic backend
+(configurable latency, no network), then drives it from many concurrent
+keep-alive clients and reports throughput, latency percentiles and how
+many requests were answered 200 / 304 / 429.
+
+Usage:
+    python benchmarks/bench_server.py
+    python benchmarks/bench_server.py --clients 64 --requests 50 --specs 20 --latency 0.2
+    python benchmarks/bench_server.py --replay data/fixtures   # recorded responses instead
+
+--specs controls how often specs repeat (fewer specs = more ETag/304 hits).
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_hotpath import synthetic_item
+from cache import SearchCache
+from local_index import LocalIndex
+from recommender import RecommenderEngine
+from resilience import UpstreamGuard
+from server import PlaylistServer, PlaylistService
+from transport import FixtureStore, ReplayTransport
+from ytm_client import YTMusicClient
+
+MOODS = ["happy", "sad", "calm", "energetic", "romantic"]
+ACTIVITIES = ["study", "workout", "commute", "party", "sleep"]
+TIMES = ["morning", "afternoon", "night"]
+
+
+class SyntheticBackend:
+    """search()/get_song() stand-in returning synthetic songs after a delay"""
+
+    def __init__(self, latency: float = 0.1):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def search(self, query, filter=None, limit=20):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        offset = sum(map(ord, query)) * 1000
+        return [synthetic_item(offset + i) for i in range(limit)]
+
+    def get_song(self, video_id):
+        time.sleep(self.latency)
+        return {"videoDetails": {"videoId": video_id, "title": f"Song {video_id}",
+                                 "author": "Synthetic Artist", "lengthSeconds": "210"}}
+
+
+def _spec(rng: random.Random, pool: int) -> dict:
+    i = rng.randrange(pool)
+    return {
+        "mood": MOODS[i % len(MOODS)],
+        "activity": ACTIVITIES[(i // len(MOODS)) % len(ACTIVITIES)],
+        "time": TIMES[(i // 25) % len(TIMES)],
+        "count": 20,
+    }
+
+
+def _client(port: int, requests: int, pool: int, seed: int, results: list):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    etags = {}
+    for _ in range(requests):
+        query = urlencode(_spec(rng, pool))
+        headers = {"If-None-Match": etags[query]} if query in etags else {}
+        start = time.perf_counter()
+        conn.request("GET", f"/generate?{query}", headers=headers)
+        response = conn.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - start
+        if response.status == 200:
+            etags[query] = response.getheader("ETag")
+        elif response.status == 429:
+            time.sleep(float(response.getheader("Retry-After", "1")) * rng.random())
+        results.append((response.status, elapsed))
+    conn.close()
+
+
+def run(args) -> dict:
+    if args.replay:
+        backend = ReplayTransport(FixtureStore(args.replay), latency=args.latency, strict=False)
+    else:
+        backend = SyntheticBackend(args.latency)
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_server_")
+    client = YTMusicClient(
+        cache=SearchCache(None, enabled=args.search_cache),
+        client=backend,
+        index=LocalIndex(os.path.join(tmp_dir, "index.json")),
+        guard=UpstreamGuard.unlimited()
+    )
+    service = PlaylistService(
+        RecommenderEngine(client),
+        max_concurrent=args.max_concurrent,
+        queue_timeout=args.queue_timeout
+    )
+    httpd = PlaylistServer(("127.0.0.1", 0), service)
+    port = httpd.server_address[1]
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    results = []
+    threads = [
+        threading.Thread(target=_client, args=(port, args.requests, args.specs, seed, results))
+        for seed in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", "/health")
+    health = json.loads(conn.getresponse().read())
+    httpd.shutdown()
+    httpd.server_close()
+
+    latencies = sorted(elapsed for _, elapsed in results)
+    codes = {}
+    for status, _ in results:
+        codes[status] = codes.get(status, 0) + 1
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+    return {
+        "requests": len(results),
+        "wall_seconds": round(wall, 3),
+        "requests_per_sec": round(len(results) / wall, 1),
+        "status_counts": codes,
+        "latency_ms": {
+            "p50": round(pct(0.50), 2),
+            "p95": round(pct(0.95), 2),
+            "p99": round(pct(0.99), 2),
+            "mean": round(statistics.mean(latencies) * 1000, 2),
+        },
+        "upstream_calls": getattr(backend, "calls", None),
+        "health": health,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32, help="concurrent keep-alive clients")
+    parser.add_argument("--requests", type=int, default=25, help="requests per client")
+    parser.add_argument("--specs", type=int, default=40, help="distinct specs drawn from")
+    parser.add_argument("--latency", type=float, default=0.1, help="backend latency per call (seconds)")
+    parser.add_argument("--max-concurrent", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=0.25)
+    parser.add_argument("--search-cache", action="store_true", help="enable the in-memory search cache")
+    parser.add_argument("--replay", help="fixture directory to replay instead of the synthetic backend")
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import metrics
+from exporters import atomic_write
+from models import Track
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "data/cache"
+
+
+class SearchCache:
+    """Two-level (memory + disk) LRU cache for parsed search results"""
+
+    def __init__(
+        self,
+        cache_dir: str = CACHE_DIR,
+        ttl: float = 6 * 60 * 60,
+        max_entries: int = 256,
+        max_disk_bytes: int = 20 * 1024 * 1024,
+        enabled: bool = True,
+        stale_ttl: float = 24 * 60 * 60
+    ):
+        """
+        Initialize cache
+
+        Args:
+            cache_dir: Directory for on-disk entries (None = memory only)
+            ttl: Seconds before an entry is considered expired
+            max_entries: Max entries kept in memory (LRU)
+            max_disk_bytes: Max total size of on-disk entries (LRU by mtime)
+            enabled: Set False to bypass the cache entirely
+            stale_ttl: Seconds past ttl an expired entry is kept as a fallback
+                for when upstream is unavailable (see get(allow_stale=True))
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.max_disk_bytes = max_disk_bytes
+        self.enabled = enabled
+        self.stale_ttl = max(0.0, stale_ttl)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._memory: "OrderedDict[str, Tuple[float, List[dict]]]" = OrderedDict()
+        # On-disk entry sizes in LRU order, scanned once on first use
+        self._disk: "Optional[OrderedDict[str, int]]" = None
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"⚠ Cache dir unavailable, memory only: {e}")
+                self.cache_dir = None
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize query so equivalent searches share one entry"""
+        return " ".join((query or "").lower().split())
+
+    def make_key(self, query: str, limit: int, kind: str = "") -> str:
+        """Build cache key from normalized query, limit and optional search kind"""
+        key = f"{self.normalize_query(query)}|{int(limit)}"
+        return f"{kind}:{key}" if kind else key
+
+    def get(self, query: str, limit: int, kind: str = "", allow_stale: bool = False) -> Optional[List[Track]]:
+        """
+        Return cached tracks or None on miss/expiry
+
+        With allow_stale, entries up to stale_ttl past expiry are returned
+        too (used when upstream is down); such lookups leave the hit/miss
+        counters alone.
+        """
+        if not self.enabled:
+            return None
+
+        key = self.make_key(query, limit, kind)
+        now = time.time()
+        max_age = self.ttl + self.stale_ttl if allow_stale else self.ttl
+        result = "stale" if allow_stale else "hit"
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, items = entry
+                if now - stored_at <= max_age:
+                    self._memory.move_to_end(key)
+                    if not allow_stale:
+                        self.hits += 1
+                    metrics.inc("cache_requests_total", result=result, level="memory")
+                    return [Track(**d) for d in items]
+                if now - stored_at > self.ttl + self.stale_ttl:
+                    del self._memory[key]
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            stored_at, items = entry
+            if now - stored_at <= max_age:
+                with self._lock:
+                    self._remember(key, stored_at, items)
+                    if not allow_stale:
+                        self.hits += 1
+                metrics.inc("cache_requests_total", result=result, level="disk")
+                return [Track(**d) for d in items]
+            if now - stored_at > self.ttl + self.stale_ttl:
+                self._remove_disk(key)
+
+        if not allow_stale:
+            with self._lock:
+                self.misses += 1
+        metrics.inc("cache_requests_total", result="stale_miss" if allow_stale else "miss", level="none")
+        return None
+
+    def put(self, query: str, limit: int, tracks: List[Track], kind: str = ""):
+        """Store tracks for query/limit (empty results are not cached)"""
+        if not self.enabled or not tracks:
+            return
+
+        key = self.make_key(query, limit, kind)
+        stored_at = time.time()
+        items = [t.to_dict() for t in tracks]
+
+        with self._lock:
+            self._remember(key, stored_at, items)
+
+        self._write_disk(key, stored_at, items)
+
+    def clear(self):
+        """Drop all memory and disk entries"""
+        with self._lock:
+            self._memory.clear()
+            for path in self._disk_files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._disk = OrderedDict()
+            self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": len(self._memory),
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _remember(self, key: str, stored_at: float, items: List[dict]):
+        """Insert into memory LRU (caller holds lock)"""
+        self._memory[key] = (stored_at, items)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _path_for(self, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"search_{digest}.json")
+
+    def _disk_files(self) -> List[str]:
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return []
+        return [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.startswith("search_") and name.endswith(".json")
+        ]
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, List[dict]]]:
+        path = self._path_for(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("key") != key:
+                return None
+            # Touch file so disk eviction follows LRU order
+            os.utime(path, None)
+            with self._lock:
+                if self._disk is not None and path in self._disk:
+                    self._disk.move_to_end(path)
+            return float(data["stored_at"]), list(data["tracks"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"⚠ Corrupt cache entry {path}: {e}")
+            self._remove_disk(key)
+            return None
+
+    def _write_disk(self, key: str, stored_at: float, items: List[dict]):
+        path = self._path_for(key)
+        if not path:
+            return
+        try:
+            with atomic_write(path) as f:
+                json.dump({"key": key, "stored_at": stored_at, "tracks": items}, f, ensure_ascii=False)
+            size = os.path.getsize(path)
+        except OSError as e:
+            logger.warning(f"⚠ Failed to write cache entry: {e}")
+            return
+
+        with self._lock:
+            disk = self._disk_index()
+            self._disk_bytes += size - disk.pop(path, 0)
+            disk[path] = size
+            self._enforce_disk_budget()
+
+    def _remove_disk(self, key: str):
+        path = self._path_for(key)
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._lock:
+                if self._disk is not None:
+                    self._disk_bytes -= self._disk.pop(path, 0)
+
+    def _disk_index(self) -> "OrderedDict[str, int]":
+        """Sizes of on-disk entries, oldest first (caller holds lock)"""
+        if self._disk is None:
+            entries = []
+            for path in self._disk_files():
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, path, st.st_size))
+            entries.sort()
+            self._disk = OrderedDict((path, size) for _, path, size in entries)
+            self._disk_bytes = sum(self._disk.values())
+        return self._disk
+
+    def _enforce_disk_budget(self):
+        """Evict least recently used disk entries until under budget (caller holds lock)"""
+        disk = self._disk_index()
+        while self._disk_bytes > self.max_disk_bytes and len(disk) > 1:
+            path, size = disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except OSError:
+                pass
+
+    def __repr__(self) -> str:
+        return f"SearchCache(entries={len(self._memory)}, hits={self.hits}, misses={self.misses})"
@@ -0,0 +1,427 @@
+"""
+Headless batch generation: playlist specs in, exported playlists out.
+
+Usage:
+    python main.py batch specs.ndjson --out-dir data/batch --format m3u8
+    python main.py batch specs.csv --workers 16
+    cat specs.ndjson | python main.py batch - --out-dir out
+
+Each spec is one NDJSON object or CSV row with the fields mood, activity,
+time (or time_of_day), and optionally genre, count (or top_n), deep,
+fan_out, target_seconds and id. Finished specs are appended to
+<out-dir>/manifest.ndjson; re-running the same command skips them, so an
+interrupted job resumes where it stopped. Never imports tkinter.
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+from exporters import WRITERS, export_tracks
+from resilience import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUT_DIR = "data/batch"
+MANIFEST_NAME = "manifest.ndjson"
+PROGRESS_EVERY = 100
+
+# Input column -> generate() argument
+_FIELD_ALIASES = {
+    "mood": "mood",
+    "activity": "activity",
+    "time": "time_of_day",
+    "time_of_day": "time_of_day",
+    "genre": "genre",
+    "count": "top_n",
+    "top_n": "top_n",
+    "deep": "deep",
+    "fan_out": "fan_out",
+    "target_seconds": "target_seconds",
+    "tolerance": "tolerance",
+}
+_INT_FIELDS = {"top_n", "target_seconds", "tolerance"}
+_BOOL_FIELDS = {"deep", "fan_out"}
+_REQUIRED = ("mood", "activity", "time_of_day")
+_UNSAFE_KEY_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+MAX_KEY_LENGTH = 80
+# Output stems a spec id must not take (the manifest lives next to the playlists)
+_RESERVED_KEYS = {os.path.splitext(MANIFEST_NAME)[0].lower()}
+
+
+class SpecError(ValueError):
+    """A spec line that cannot be turned into generate() arguments"""
+
+
+class BatchSpec(dict):
+    """generate() keyword arguments plus the spec's stable key"""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: str, params: Dict):
+        super().__init__(params)
+        self.key = key
+
+
+# ----------------------------------------------------------------------
+# Spec parsing
+# ----------------------------------------------------------------------
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    return bool(value)
+
+
+def normalize_spec(raw: Dict) -> Tuple[Optional[str], Dict]:
+    """
+    Map an input record to (explicit id or None, generate() kwargs)
+
+    Raises:
+        SpecError: Missing required fields or non-numeric counts
+    """
+    params = {}
+    for field, value in raw.items():
+        name = _FIELD_ALIASES.get(str(field).strip().lower())
+        if name is None or value is None or value == "":
+            continue
+        if name in _INT_FIELDS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise SpecError(f"{field} must be an integer, got {value!r}")
+        elif name in _BOOL_FIELDS:
+            value = _to_bool(value)
+        else:
+            value = str(value).strip()
+        params[name] = value
+
+    missing = [name for name in _REQUIRED if not params.get(name)]
+    if missing:
+        raise SpecError(f"missing {', '.join(missing)}")
+
+    spec_id = raw.get("id")
+    return (str(spec_id).strip() or None) if spec_id is not None else None, params
+
+
+def spec_key(params: Dict) -> str:
+    """Content hash of the normalized parameters"""
+    canonical = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+def safe_key(spec_id: str) -> str:
+    """
+    Turn an explicit spec id into a plain file name
+
+    Safe ids are kept as they are. Anything else ("../x", "a/b", very long
+    ids, or the manifest's own name) is reduced to [A-Za-z0-9_.-] and
+    suffixed with a hash of the original, so distinct ids never share an
+    output file and no playlist can overwrite the manifest.
+    """
+    cleaned = _UNSAFE_KEY_CHARS.sub("_", spec_id).lstrip(".")
+    reserved = cleaned.split(".")[0].lower() in _RESERVED_KEYS
+    if cleaned == spec_id and len(cleaned) <= MAX_KEY_LENGTH and not reserved:
+        return spec_id
+    digest = hashlib.sha1(spec_id.encode("utf-8")).hexdigest()[:8]
+    return f"{cleaned[:MAX_KEY_LENGTH]}-{digest}" if cleaned else digest
+
+
+def _detect_format(path: str, f: TextIO) -> Tuple[str, Iterable[str]]:
+    """'ndjson' or 'csv' from the extension, else from the first character"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv", f
+    if ext in (".ndjson", ".jsonl", ".json"):
+        return "ndjson", f
+
+    # stdin / unknown extension: peek at the first line, then put it back
+    head = f.readline()
+    return ("ndjson" if head.lstrip().startswith("{") else "csv"), itertools.chain([head], f)
+
+
+def read_specs(path: str, errors: Optional[list] = None) -> Iterator[BatchSpec]:
+    """
+    Stream BatchSpecs from an NDJSON/CSV file, or stdin when path is "-"
+
+    Keys are the spec's own `id` (made file-name safe, see safe_key) or a
+    hash of its parameters; repeated identical specs get -2, -3, ...
+    suffixes so each still runs once.
+    Invalid records are logged, appended to `errors` as (position, message)
+    and skipped.
+    """
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8", newline="")
+    seen: Dict[str, int] = {}
+    try:
+        fmt, stream = _detect_format("" if path == "-" else path, f)
+        for position, raw in enumerate(_iter_records(stream, fmt), start=1):
+            if isinstance(raw, SpecError):
+                _report_invalid(errors, position, str(raw))
+                continue
+            try:
+                spec_id, params = normalize_spec(raw)
+            except SpecError as e:
+                _report_invalid(errors, position, str(e))
+                continue
+
+            key = safe_key(spec_id) if spec_id else spec_key(params)
+            seen[key] = seen.get(key, 0) + 1
+            if seen[key] > 1:
+                key = f"{key}-{seen[key]}"
+            yield BatchSpec(key, params)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _iter_records(stream: Iterable[str], fmt: str) -> Iterator:
+    """Records, with per-line JSON errors yielded instead of raised"""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+
+    for lineno, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield SpecError(f"line {lineno}: invalid JSON ({e.msg})")
+            continue
+        yield record if isinstance(record, dict) else SpecError(f"line {lineno}: expected an object")
+
+
+def _report_invalid(errors: Optional[list], position: int, message: str):
+    logger.warning(f"⚠ Skipping spec #{position}: {message}")
+    if errors is not None:
+        errors.append((position, message))
+
+
+# ----------------------------------------------------------------------
+# Manifest
+# ----------------------------------------------------------------------
+class BatchManifest:
+    """Append-only NDJSON record of finished specs, used to resume a batch
+
+    One line per finished spec, flushed as soon as its playlist file is in
+    place. A spec counts as done when its last entry is "ok" and the
+    output file still exists; failed specs are retried on the next run.
+    A torn last line from a killed process is ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self._load()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._f = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        line = ""
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self.entries[entry["id"]] = entry
+                except (ValueError, KeyError, TypeError):
+                    continue
+        if line and not line.endswith("\n"):
+            # Terminate the torn line so the next entry starts cleanly
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n")
+
+    def is_done(self, key: str) -> bool:
+        entry = self.entries.get(key)
+        return entry is not None and entry.get("status") == "ok" and os.path.exists(entry.get("path") or "")
+
+    def record(self, key: str, status: str, **fields):
+        entry = {"id": key, "status": status, "finished_at": time.time(), **fields}
+        self.entries[key] = entry
+        self._f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+# ----------------------------------------------------------------------
+# Batch run
+# ----------------------------------------------------------------------
+def build_engine(cache_dir: str = "data/cache"):
+    """RecommenderEngine with a connected client (transport from environment)"""
+    from cache import SearchCache
+    from recommender import RecommenderEngine
+    from transport import guard_for, transport_from_env
+    from ytm_client import YTMusicClient
+
+    transport = transport_from_env()
+    ytm = YTMusicClient(cache=SearchCache(cache_dir), client=transport, guard=guard_for(transport))
+    return RecommenderEngine(ytm)
+
+
+def close_engine(engine):
+    """Persist the local index and, if SMARTPLAYLIST_METRICS is set, the metrics"""
+    yt = getattr(engine, "yt", None)
+    if yt is not None:
+        yt.index.save()
+
+    metrics_path = os.environ.get("SMARTPLAYLIST_METRICS")
+    if metrics_path:
+        from metrics import METRICS
+        try:
+            METRICS.write(metrics_path)
+        except OSError as e:
+            logger.warning(f"⚠ Failed to write metrics: {e}")
+
+
+def run_batch(
+    engine,
+    specs: Iterable[BatchSpec],
+    out_dir: str = DEFAULT_OUT_DIR,
+    fmt: str = "json",
+    workers: int = 8,
+    resume: bool = True
+) -> Dict[str, int]:
+    """
+    Generate and export every spec not already finished in `out_dir`
+
+    Args:
+        engine: RecommenderEngine (shared by all workers)
+        specs: BatchSpecs, consumed lazily
+        out_dir: Directory for playlist files and the manifest
+        fmt: Export format (see exporters.WRITERS)
+        workers: Max concurrent generations
+        resume: Skip specs the manifest records as done
+
+    Returns:
+        Counts: ok, failed, skipped (already done)
+    """
+    writer_cls = WRITERS.get(fmt)
+    if writer_cls is None:
+        raise ValueError(f"Unsupported export format: {fmt!r} (choose from {', '.join(sorted(WRITERS))})")
+
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    if not resume and os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    manifest = BatchManifest(manifest_path)
+    counts = {"ok": 0, "failed": 0, "skipped": 0}
+    started = {}
+
+    def pending() -> Iterator[BatchSpec]:
+        for spec in specs:
+            if manifest.is_done(spec.key):
+                counts["skipped"] += 1
+                continue
+            started[spec.key] = time.perf_counter()
+            yield spec
+
+    start = time.perf_counter()
+    finished = 0
+    unavailable = 0
+    try:
+        for spec, playlist, query in engine.generate_many(pending(), max_workers=workers, return_exceptions=True):
+            seconds = round(time.perf_counter() - started.pop(spec.key, start), 3)
+
+            # Failures arrive as exceptions, None means nothing was found;
+            # either way the spec is retried on the next run
+            if isinstance(playlist, UpstreamUnavailable):
+                manifest.record(
+                    spec.key, "error", query=query, seconds=seconds, reason="upstream_unavailable",
+                    error=str(playlist), retry_after=playlist.retry_after
+                )
+                counts["failed"] += 1
+                unavailable += 1
+            elif isinstance(playlist, Exception) or playlist is None:
+                if playlist is None:
+                    reason, error = "no_tracks", "no tracks found"
+                else:
+                    reason, error = "error", str(playlist)
+                manifest.record(spec.key, "error", query=query, seconds=seconds, reason=reason, error=error)
+                counts["failed"] += 1
+            else:
+                path = os.path.join(out_dir, f"{spec.key}{writer_cls.extension}")
+                try:
+                    count = export_tracks(playlist.tracks, path, fmt=fmt, name=playlist.name)
+                except OSError as e:
+                    manifest.record(spec.key, "error", query=query, seconds=seconds, error=str(e))
+                    counts["failed"] += 1
+                else:
+                    manifest.record(
+                        spec.key, "ok",
+                        path=path, name=playlist.name, query=query, tracks=count, seconds=seconds
+                    )
+                    counts["ok"] += 1
+
+            finished += 1
+            if finished % PROGRESS_EVERY == 0:
+                rate = finished / max(time.perf_counter() - start, 1e-9)
+                logger.info(f"⏱ {finished} specs done ({rate:.1f}/s), {counts['skipped']} skipped")
+    finally:
+        manifest.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"✓ Batch finished in {elapsed:.1f}s: {counts['ok']} ok, {counts['failed']} failed, "
+        f"{counts['skipped']} already done"
+    )
+    if unavailable:
+        logger.warning(f"⚠ {unavailable} specs failed because YouTube Music was unavailable; re-run later to retry them")
+    return counts
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="main.py batch", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("input", nargs="?", default="-", help="NDJSON/CSV spec file, or - for stdin (default)")
+    parser.add_argument("-o", "--out-dir", default=DEFAULT_OUT_DIR, help=f"output directory (default {DEFAULT_OUT_DIR})")
+    parser.add_argument("-f", "--format", default="json", choices=sorted(WRITERS), help="export format (default json)")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="concurrent generations (default 8)")
+    parser.add_argument("--fresh", action="store_true", help="ignore the manifest and regenerate everything")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every pipeline step")
+    args = parser.parse_args(argv)
+
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if not args.verbose:
+        # Per-spec pipeline logging drowns out progress on big batches
+        logging.getLogger().setLevel(logging.WARNING)
+        logger.setLevel(logging.INFO)
+
+    invalid = []
+    engine = None
+    try:
+        engine = build_engine()
+        counts = run_batch(
+            engine,
+            read_specs(args.input, errors=invalid),
+            out_dir=args.out_dir,
+            fmt=args.format,
+            workers=args.workers,
+            resume=not args.fresh
+        )
+    except Exception as e:
+        # Engine setup, unreadable input or a broken manifest: no traceback
+        logger.error(f"✗ Batch failed: {e}")
+        logger.debug("Batch failure details", exc_info=True)
+        return 2
+    except KeyboardInterrupt:
+        logger.warning("⚠ Interrupted; re-run the same command to resume")
+        return 130
+    finally:
+        close_engine(engine)
+
+    return 1 if counts["failed"] or invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import logging
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Sequence
+
+import numpy as np
+
+from models import Track
+
+logger = logging.getLogger(__name__)
+
+# Words that mark an upload variant rather than a different song
+_NOISE = (
+    r"official|video|audio|lyrics?|lyric video|remaster(?:ed)?|\d{4} remaster(?:ed)?|hd|hq|4k|"
+    r"mv|m/v|visuali[sz]er|explicit|clean|radio edit|color coded|"
+    r"with lyrics|full song|music video|audio only|mono|stereo"
+)
+_BRACKETED = re.compile(r"[\(\[\{【]([^\)\]\}】]*)[\)\]\}】]")
+_BRACKET_NOISE = re.compile(rf"^[\s\d]*$|\b(?:{_NOISE}|feat\.?|ft\.?|featuring)(?:\b|\s|$)", re.IGNORECASE)
+_DASH_SUFFIX = re.compile(rf"\s[-–—|]\s[^-–—|]*\b(?:{_NOISE})\b[^-–—|]*$", re.IGNORECASE)
+_FEAT = re.compile(r"\s(?:feat\.?|ft\.?|featuring)\s.*$", re.IGNORECASE)
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+_NUMBER = re.compile(r"\d+")
+# Cheap pre-checks so most titles skip the regexes entirely
+_BRACKET_CHARS = frozenset("([{【")
+_DASH_CHARS = frozenset("-–—|")
+_CHANNEL_SUFFIX = re.compile(r"(?:\s*-\s*topic|vevo|official|music|tv)$", re.IGNORECASE)
+
+_MERSENNE = (1 << 31) - 1
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents"""
+    text = text or ""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+@lru_cache(maxsize=65536)
+def normalize_channel(channel: str) -> str:
+    """'Artist - Topic' / 'ArtistVEVO' / 'Artist Official' -> 'artist'"""
+    value = _fold(channel).strip()
+    previous = None
+    while value != previous:
+        previous = value
+        value = _CHANNEL_SUFFIX.sub("", value).strip()
+    return _NON_WORD.sub("", value)
+
+
+def normalize_title(title: str, channel: str = "") -> str:
+    """Strip upload decorations: (Official Video), [Lyrics], - Remastered 2011, feat. X, 'Artist - ' prefix"""
+    value = _fold(title)
+
+    # Drop bracketed decorations; keep brackets that are part of the name
+    if _BRACKET_CHARS.intersection(value):
+        value = _BRACKETED.sub(
+            lambda m: " " if _BRACKET_NOISE.search(m.group(1)) else m.group(0),
+            value
+        )
+    if _DASH_CHARS.intersection(value):
+        value = _DASH_SUFFIX.sub("", value)
+    if "f" in value:
+        value = _FEAT.sub("", value)
+
+    # "Artist - Song" where Artist is the uploading channel
+    if " - " in value and channel:
+        head, tail = value.split(" - ", 1)
+        if normalize_channel(head) == normalize_channel(channel):
+            value = tail
+
+    # "Don't" and "Dont" are the same word
+    value = _NON_WORD.sub(" ", value.replace("'", "").replace("’", ""))
+    return " ".join(value.split())
+
+
+class NearDuplicateFilter:
+    """Collapse uploads of the same song (MinHash + LSH, near-linear time)
+
+    Stage 1 drops exact repeats of (normalized channel, normalized title).
+    Stage 2 computes MinHash signatures of character 3-grams in vectorized
+    batches, buckets them with LSH banding, and only verifies pairs that
+    share a bucket (estimated Jaccard >= threshold and matching artist), so
+    the cost grows with the number of tracks rather than pairs.
+    Character n-grams cannot tell "Love Song" from "Love Songs", so a
+    candidate is only merged when one title's words all appear in the other.
+    The first track of every duplicate group is kept.
+
+    >>> f = NearDuplicateFilter()
+    >>> [t.title for t in f.filter([
+    ...     Track(title="Love Song", channel="Adele"),
+    ...     Track(title="Love Songs", channel="Adele"),
+    ...     Track(title="Love Song (Official Video)", channel="Adele - Topic"),
+    ... ])]
+    ['Love Song', 'Love Songs']
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.7,
+        num_perm: int = 32,
+        bands: int = 8,
+        batch_size: int = 10000,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.batch_size = batch_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE, size=num_perm, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 1 << 62, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+    def _signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """MinHash signature matrix (n x num_perm), computed in batches
+
+        Character 3-grams are packed from code points straight into
+        integers with NumPy, so signatures are deterministic across runs.
+        """
+        n = len(texts)
+        signatures = np.empty((n, self.num_perm), dtype=np.uint64)
+        mersenne = np.uint64(_MERSENNE)
+
+        for start in range(0, n, self.batch_size):
+            # Pad every text so it has at least one 3-gram
+            batch = [f" {t} " if len(t) else "   " for t in texts[start:start + self.batch_size]]
+            lengths = np.fromiter((len(t) for t in batch), dtype=np.int64, count=len(batch))
+            points = np.frombuffer("".join(batch).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+
+            # gram at p = points[p..p+2]; keep only grams inside one text
+            grams = ((points[:-2] << np.uint64(42)) | (points[1:-1] << np.uint64(21)) | points[2:]) % mersenne
+            counts = lengths - 2
+            text_starts = np.cumsum(lengths) - lengths
+            gram_offsets = np.cumsum(counts) - counts
+            positions = np.repeat(text_starts - gram_offsets, counts) + np.arange(int(counts.sum()))
+
+            # (num_perm x grams) layout keeps reduceat on contiguous rows
+            hashed = (self._a[:, None] * grams[positions] + self._b[:, None]) % mersenne
+            signatures[start:start + len(batch)] = np.minimum.reduceat(hashed, gram_offsets, axis=1).T
+
+        return signatures
+
+    def _candidate_pairs(self, signatures: np.ndarray) -> np.ndarray:
+        """(representative, member) index pairs sharing at least one LSH bucket"""
+        n = len(signatures)
+        codes = []
+        for band in range(self.bands):
+            block = signatures[:, band * self.rows:(band + 1) * self.rows]
+            keys = (block * self._band_mix).sum(axis=1, dtype=np.uint64)
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            sizes = np.diff(np.r_[starts, n])
+            # Pair every bucket member with the bucket's lowest index
+            reps = np.repeat(np.minimum.reduceat(order, starts), sizes)
+            shared = np.repeat(sizes > 1, sizes) & (reps != order)
+            codes.append(reps[shared].astype(np.int64) * n + order[shared])
+        if not codes:
+            return np.empty((0, 2), dtype=np.int64)
+        unique = np.unique(np.concatenate(codes))
+        return np.column_stack(np.divmod(unique, n))
+
+    def filter(self, tracks: Sequence[Track]) -> List[Track]:
+        """Return tracks with near-duplicates removed (order preserved)"""
+        n = len(tracks)
+        if n < 2:
+            return list(tracks)
+
+        channels = [normalize_channel(t.channel) for t in tracks]
+        titles = [normalize_title(t.title, t.channel) for t in tracks]
+
+        # Stage 1: exact normalized key
+        seen = {}
+        keep_idx = []
+        for i, key in enumerate(zip(channels, titles)):
+            if key not in seen:
+                seen[key] = i
+                keep_idx.append(i)
+        exact_dropped = n - len(keep_idx)
+
+        # Stage 2: MinHash / LSH on the survivors
+        signatures = self._signatures([titles[i] for i in keep_idx])
+
+        parent = list(range(len(keep_idx)))
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        # Verify all candidate pairs at once: MinHash agreement estimates
+        # Jaccard similarity, and both sides must be the same artist
+        pairs = self._candidate_pairs(signatures)
+        if len(pairs):
+            similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+            pairs = pairs[similarity >= self.threshold]
+        if len(pairs):
+            # "Part 1" / "Part 2", "No. 5" / "No. 6" are different songs
+            number_codes = {}
+            numbers = np.fromiter(
+                (number_codes.setdefault(tuple(_NUMBER.findall(titles[i])), len(number_codes)) for i in keep_idx),
+                dtype=np.int64, count=len(keep_idx)
+            )
+            pairs = pairs[numbers[pairs[:, 0]] == numbers[pairs[:, 1]]]
+
+        channel_codes = {}
+        codes = np.fromiter(
+            (channel_codes.setdefault(channels[i], len(channel_codes)) for i in keep_idx),
+            dtype=np.int64, count=len(keep_idx)
+        )
+
+        words = {}
+
+        def same_words(i: int, j: int) -> bool:
+            # Every word of the shorter title must appear in the longer one
+            for k in (i, j):
+                if k not in words:
+                    words[k] = frozenset(titles[k].split())
+            a, b = sorted((words[i], words[j]), key=len)
+            return a <= b
+
+        for rep, member in pairs.tolist():
+            i, j = keep_idx[rep], keep_idx[member]
+            if not same_words(i, j):
+                continue
+            if codes[rep] != codes[member]:
+                if not (
+                    (channels[i] and channels[i] in titles[j].replace(" ", ""))
+                    or (channels[j] and channels[j] in titles[i].replace(" ", ""))
+                ):
+                    continue
+            ri, rj = find(rep), find(member)
+            if ri != rj:
+                # Lower index (higher priority) becomes the root
+                parent[max(ri, rj)] = min(ri, rj)
+
+        result = [tracks[keep_idx[k]] for k in range(len(keep_idx)) if find(k) == k]
+        logger.info(
+            f"Near-duplicate filter: {n} -> {len(result)} tracks "
+            f"({exact_dropped} exact, {len(keep_idx) - len(result)} fuzzy)"
+        )
+        return result
+
+    def __repr__(self) -> str:
+        return f"NearDuplicateFilter(threshold={self.threshold}, num_perm={self.num_perm}, bands={self.bands})"
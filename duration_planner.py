@@ -0,0 +1,95 @@
+import logging
+from typing import List, Sequence
+
+from models import Track
+
+logger = logging.getLogger(__name__)
+
+# Bitset DP considers at most this many (highest-priority) candidates
+MAX_DP_ITEMS = 1000
+
+
+def total_seconds(tracks: Sequence[Track]) -> int:
+    return sum(t.seconds for t in tracks if t.seconds > 0)
+
+
+def plan_duration(
+    tracks: Sequence[Track],
+    target_seconds: int,
+    tolerance: int = 60,
+    max_items: int = MAX_DP_ITEMS
+) -> List[Track]:
+    """
+    Pick tracks whose total length lands within target_seconds ± tolerance
+
+    `tracks` must be in priority order (best first). A greedy pass takes
+    tracks in that order while they fit; if it misses the window, a
+    bounded subset-sum DP over the first `max_items` candidates repairs
+    it. The DP keeps reachable sums as bits of one Python int (one shift
+    + OR per track, 1-second resolution) and reconstructs the subset
+    preferring higher-priority tracks. The result keeps priority order.
+
+    Returns:
+        Selected tracks (best effort when the window is unreachable)
+    """
+    target = max(0, int(target_seconds))
+    tolerance = max(0, int(tolerance))
+    upper = target + tolerance
+    lower = max(0, target - tolerance)
+
+    usable = [t for t in tracks if 0 < t.seconds <= upper]
+    if not usable or target == 0:
+        return []
+
+    # Greedy pass in priority order
+    greedy: List[Track] = []
+    total = 0
+    for track in usable:
+        if total + track.seconds <= upper:
+            greedy.append(track)
+            total += track.seconds
+            if total >= lower:
+                break
+
+    if lower <= total <= upper:
+        logger.info(f"✓ Duration plan (greedy): {len(greedy)} tracks, {total}s for target {target}s")
+        return greedy
+
+    # Bounded subset-sum repair
+    pool = usable[:max(1, max_items)]
+    mask = (1 << (upper + 1)) - 1
+    reach = 1
+    history = []
+    for track in pool:
+        history.append(reach)
+        reach = (reach | (reach << track.seconds)) & mask
+
+    best = None
+    for distance in range(tolerance + 1):
+        for candidate in (target - distance, target + distance):
+            if lower <= candidate <= upper and (reach >> candidate) & 1:
+                best = candidate
+                break
+        if best is not None:
+            break
+
+    if best is None:
+        logger.warning(
+            f"⚠ No subset within {tolerance}s of {target}s; returning greedy best effort ({total}s)"
+        )
+        return greedy
+
+    # Walk back from the last candidate: skip a track whenever the
+    # remaining sum was already reachable without it, so earlier
+    # (higher-priority) tracks are preferred
+    chosen = [False] * len(pool)
+    remaining = best
+    for i in range(len(pool) - 1, -1, -1):
+        if (history[i] >> remaining) & 1:
+            continue
+        chosen[i] = True
+        remaining -= pool[i].seconds
+
+    selected = [track for track, keep in zip(pool, chosen) if keep]
+    logger.info(f"✓ Duration plan (DP): {len(selected)} tracks, {best}s for target {target}s")
+    return selected
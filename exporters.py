@@ -0,0 +1,185 @@
+import csv
+import json
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, TextIO, Type
+
+from models import Track
+
+logger = logging.getLogger(__name__)
+
+WRITE_BUFFER = 1 << 16
+
+
+@contextmanager
+def atomic_write(path: str, newline: Optional[str] = None):
+    """
+    Open a temp file next to `path` and move it into place on success
+
+    A crash or exception mid-write leaves the previous file (if any)
+    untouched and removes the partial temp file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+
+    try:
+        with open(tmp_path, "x", encoding="utf-8", newline=newline, buffering=WRITE_BUFFER) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class PlaylistWriter:
+    """Streaming writer: begin() once, write_track() per track, end() once"""
+
+    extension = ""
+    newline: Optional[str] = None
+
+    def __init__(self, f: TextIO, name: str = "Playlist"):
+        self.f = f
+        self.name = name
+        self.count = 0
+
+    def begin(self):
+        pass
+
+    def write_track(self, track: Track):
+        raise NotImplementedError
+
+    def end(self):
+        pass
+
+    def write_all(self, tracks: Iterable[Track]) -> int:
+        """Write header, every track and footer; returns track count"""
+        self.begin()
+        for track in tracks:
+            self.write_track(track)
+            self.count += 1
+        self.end()
+        return self.count
+
+
+class TxtWriter(PlaylistWriter):
+    """Numbered plain-text listing (the original export_txt layout)"""
+
+    extension = ".txt"
+
+    def begin(self):
+        self.f.write(f"{self.name}\n\n")
+
+    def write_track(self, track: Track):
+        self.f.write(f"{self.count + 1}. {track.title} - {track.channel} ({track.duration})\n{track.url}\n\n")
+
+
+class JsonWriter(PlaylistWriter):
+    """{"name": ..., "tracks": [...]} written incrementally, indent=2 layout"""
+
+    extension = ".json"
+
+    def begin(self):
+        self.f.write('{\n  "name": ')
+        self.f.write(json.dumps(self.name, ensure_ascii=False))
+        self.f.write(',\n  "tracks": [')
+
+    def write_track(self, track: Track):
+        body = json.dumps(track.to_dict(), ensure_ascii=False, indent=2).replace("\n", "\n    ")
+        self.f.write(",\n    " if self.count else "\n    ")
+        self.f.write(body)
+
+    def end(self):
+        self.f.write("\n  ]\n}" if self.count else "]\n}")
+
+
+class NdjsonWriter(PlaylistWriter):
+    """One JSON track object per line"""
+
+    extension = ".ndjson"
+
+    def write_track(self, track: Track):
+        self.f.write(json.dumps(track.to_dict(), ensure_ascii=False))
+        self.f.write("\n")
+
+
+class M3U8Writer(PlaylistWriter):
+    """Extended M3U (UTF-8) with #EXTINF duration and artist - title"""
+
+    extension = ".m3u8"
+
+    def begin(self):
+        self.f.write("#EXTM3U\n")
+        self.f.write(f"#PLAYLIST:{self.name}\n")
+
+    def write_track(self, track: Track):
+        title = f"{track.channel} - {track.title}" if track.channel else track.title
+        title = title.replace("\n", " ")
+        self.f.write(f"#EXTINF:{track.seconds},{title}\n{track.url}\n")
+
+
+class CsvWriter(PlaylistWriter):
+    """Header row of Track fields, then one row per track"""
+
+    extension = ".csv"
+    newline = ""
+
+    def begin(self):
+        self._writer = csv.writer(self.f)
+        self._writer.writerow(Track.FIELDS)
+
+    def write_track(self, track: Track):
+        # Only missing values are blank; 0 seconds is still written as 0
+        values = (getattr(track, name) for name in Track.FIELDS)
+        self._writer.writerow(["" if value is None else value for value in values])
+
+
+WRITERS: Dict[str, Type[PlaylistWriter]] = {
+    "txt": TxtWriter,
+    "json": JsonWriter,
+    "ndjson": NdjsonWriter,
+    "jsonl": NdjsonWriter,
+    "m3u8": M3U8Writer,
+    "m3u": M3U8Writer,
+    "csv": CsvWriter,
+}
+
+
+def format_for_path(path: str, default: str = "json") -> str:
+    """Infer export format from file extension"""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return ext if ext in WRITERS else default
+
+
+def export_tracks(
+    tracks: Iterable[Track],
+    path: str,
+    fmt: Optional[str] = None,
+    name: str = "Playlist"
+) -> int:
+    """
+    Stream tracks to `path` in the given format, atomically
+
+    Tracks are consumed one at a time, so any iterable (list, TrackTable,
+    generator) is exported in constant memory.
+
+    Returns:
+        Number of tracks written
+    """
+    fmt = (fmt or format_for_path(path)).lower()
+    writer_cls = WRITERS.get(fmt)
+    if writer_cls is None:
+        raise ValueError(f"Unsupported export format: {fmt!r} (choose from {', '.join(sorted(WRITERS))})")
+
+    with atomic_write(path, newline=writer_cls.newline) as f:
+        count = writer_cls(f, name=name).write_all(tracks)
+
+    logger.info(f"✓ Exported {count} tracks to {path} ({fmt})")
+    return count
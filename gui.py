@@ -2,17 +2,21 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from PIL import Image, ImageTk, ImageFilter, ImageEnhance
 import threading
+import time
 import queue
 import os
-import webbrowser
 import logging
 
 from recommender import RecommenderEngine
+from resilience import UpstreamUnavailable
 from ytm_client import YTMusicClient
+from background import BackgroundRenderer
 from models import Playlist
-from voice_handler import VoiceRecognizer
+from history import PlaylistHistory
+from scheduler import GenerationScheduler
+from playlist_view import PlaylistTreeView
+from thumbnails import ThumbnailLoader, THUMB_SIZE
 
 logger = logging.getLogger(__name__)
 BACKGROUND_IMAGE_PATH = "data/bg_smart_playlist.jpg"
@@ -24,19 +28,28 @@ BG_SIDEBAR = "#181a1d"
 BG_PANEL = "#1b1d22"
 
 
+CLIENT_WAIT_SECONDS = 30
+
+# Virtual events posted from worker threads to wake the Tk loop
+RESULT_EVENT = "<<GenerateResult>>"
+THUMBNAILS_EVENT = "<<ThumbnailsReady>>"
+
+
 class SmartPlaylistGUI:
-    def __init__(self, recommender=None, ytm_client=None):
+    def __init__(self, recommender=None, ytm_client=None, client_factory=None, timer=None):
 
-        # INIT CLIENT
-        if ytm_client is None:
-            try:
-                self.yt_client = YTMusicClient()
-            except:
-                self.yt_client = None
-        else:
-            self.yt_client = ytm_client
+        # INIT CLIENT (connected in the background after the first frame
+        # unless one is passed in)
+        self.yt_client = ytm_client
+        self.client_factory = client_factory or YTMusicClient
+        self.client_ready = threading.Event()
+        self.timer = timer
 
         self.engine = recommender or RecommenderEngine(self.yt_client)
+        if ytm_client is not None:
+            if self.engine.yt is None:
+                self.engine.attach_client(ytm_client)
+            self.client_ready.set()
 
         # ROOT FIRST
         self.root = tk.Tk()
@@ -47,40 +60,35 @@ class SmartPlaylistGUI:
         # STATE
         self.result_queue = queue.Queue()
         self.current_playlist = Playlist("(kosong)")
-        self.undo_stack = []
-        self.redo_stack = []        # NEW
+        self.history = PlaylistHistory()    # undo / redo
         self.is_generating = False
+        self.scheduler = GenerationScheduler(self._run_job, self._on_job_done)
 
-        # BACKGROUND
-        self.bg_img = self._load_background(BACKGROUND_IMAGE_PATH)
-        self.bg_label = tk.Label(self.root, image=self.bg_img)
+        # BACKGROUND (cached frame first, re-rendered off-thread on resize)
+        self.bg_label = tk.Label(self.root, bg=BG_DARK)
         self.bg_label.place(relx=0, rely=0, relwidth=1, relheight=1)
+        self.background = BackgroundRenderer(BACKGROUND_IMAGE_PATH)
+        self.background.attach(self.root, self.bg_label, (1100, 720))
 
         # MAIN CONTAINER
         self.container = tk.Frame(self.root, bg=BG_DARK)
         self.container.pack(fill="both", expand=True, padx=20, pady=20)
 
+        # Thumbnails: fetched off-thread, handed back via a virtual event
+        self.thumbnails = ThumbnailLoader(on_ready=lambda: self._post(THUMBNAILS_EVENT))
+
         # BUILD UI
         self._build_layout()
 
-        # Voice recognizer
-        self.voice = VoiceRecognizer(self._voice_callback_from_thread)
+        # Voice recognizer (loaded on first use)
+        self.voice = None
 
-        # Queue polling
-        self.root.after(200, self._poll_queue)
+        if not self.client_ready.is_set():
+            self.status_var.set("Connecting...")
 
-    # ============================
-    # BACKGROUND IMAGE
-    # ============================
-    def _load_background(self, path):
-        try:
-            img = Image.open(path).convert("RGB")
-        except:
-            img = Image.new("RGB", (1100, 720), (20, 20, 20))
-        img = img.resize((1100, 720), Image.LANCZOS)
-        img = img.filter(ImageFilter.GaussianBlur(8))
-        img = ImageEnhance.Brightness(img).enhance(0.32)
-        return ImageTk.PhotoImage(img)
+        # Worker results wake the loop directly (no polling)
+        self.root.bind(RESULT_EVENT, self._on_result)
+        self.root.bind(THUMBNAILS_EVENT, lambda e: self.playlist_view.on_thumbnails_ready())
 
     # ============================
     # BUILD UI LAYOUT
@@ -135,14 +143,28 @@ class SmartPlaylistGUI:
         # Count
         tk.Label(sidebar, text="Track Count", bg=BG_SIDEBAR, fg="white").pack(anchor="w", pady=(8, 0))
         self.count_var = tk.IntVar(value=12)
-        ttk.Spinbox(sidebar, from_=5, to=30, textvariable=self.count_var).pack(anchor="w")
+        ttk.Spinbox(sidebar, from_=RecommenderEngine.MIN_TRACKS, to=RecommenderEngine.MAX_DEEP_TRACKS,
+                    textvariable=self.count_var).pack(anchor="w")
+
+        # Duration target
+        tk.Label(sidebar, text="Target Minutes (optional)", bg=BG_SIDEBAR, fg="white").pack(anchor="w", pady=(8, 0))
+        self.minutes_var = tk.StringVar()
+        ttk.Entry(sidebar, textvariable=self.minutes_var).pack(anchor="w", fill="x")
+
+        # Fan-out (multi-query mix)
+        self.fan_out_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            sidebar, text="Multi-query mix", variable=self.fan_out_var,
+            bg=BG_SIDEBAR, fg="white", selectcolor=BG_PANEL,
+            activebackground=BG_SIDEBAR, activeforeground="white"
+        ).pack(anchor="w", pady=(8, 0))
 
         # BUTTONS (Generate, Undo, Redo)
         btn_frame = tk.Frame(sidebar, bg=BG_SIDEBAR)
         btn_frame.pack(side="bottom", fill="x", pady=10)
 
         tk.Button(btn_frame, text="🎵 Generate", bg=SPOTIFY_GREEN, fg="black",
-                  font=("Segoe UI", 12, "bold"), command=self._start_generate_thread).pack(fill="x", pady=4)
+                  font=("Segoe UI", 12, "bold"), command=self._start_generate).pack(fill="x", pady=4)
 
         tk.Button(btn_frame, text="🔙 Undo", bg="#bf1616", fg="white",
                   font=("Segoe UI", 12, "bold"), command=self._undo).pack(fill="x", pady=4)
@@ -183,7 +205,9 @@ class SmartPlaylistGUI:
         scrollbar.pack(side="right", fill="y")
 
         cols = ("No", "Title", "Channel", "Duration")
-        self.tree = ttk.Treeview(tree_frame, columns=cols, show="headings", yscrollcommand=scrollbar.set)
+        ttk.Style().configure("Treeview", rowheight=THUMB_SIZE[1] + 4)
+        self.tree = ttk.Treeview(tree_frame, columns=cols, show="tree headings")
+        self.tree.column("#0", width=THUMB_SIZE[0] + 16, stretch=False)
 
         for c in cols:
             self.tree.heading(c, text=c)
@@ -193,6 +217,9 @@ class SmartPlaylistGUI:
         self.tree.pack(fill="both", expand=True)
         scrollbar.config(command=self.tree.yview)
 
+        # Rows are rendered lazily, in chunks, as the list scrolls
+        self.playlist_view = PlaylistTreeView(self.tree, scrollbar, thumbnails=self.thumbnails)
+
         # Double-click open
         self.tree.bind("<Double-1>", lambda e: self._open_selected())
 
@@ -209,98 +236,142 @@ class SmartPlaylistGUI:
         tk.Button(btn_row, text="💾 Save JSON", fg="white", bg="#2e2e2e",
                   command=self._save_json).pack(side="left", padx=4)
 
+        tk.Button(btn_row, text="💾 Export...", fg="white", bg="#2e2e2e",
+                  command=self._save_as).pack(side="left", padx=4)
+
     # ==========================================================
-    # GENERATE THREAD
+    # GENERATE (latest-wins scheduler)
     # ==========================================================
-    def _start_generate_thread(self):
-        if self.is_generating:
+    def _snapshot_params(self) -> dict:
+        """Read every Tk variable on the main thread"""
+        top_n = int(self.count_var.get())
+        minutes = self.minutes_var.get().strip()
+        return {
+            "mood": self.mood_var.get(),
+            "activity": self.act_var.get(),
+            "time_of_day": self.time_var.get(),
+            "genre": self.genre_var.get().strip() or None,
+            "top_n": top_n,
+            # Long playlists page through results beyond one API call
+            "deep": top_n > RecommenderEngine.MAX_TRACKS,
+            "fan_out": bool(self.fan_out_var.get()),
+            "target_seconds": int(float(minutes) * 60) if minutes else None,
+        }
+
+    def _start_generate(self):
+        try:
+            params = self._snapshot_params()
+        except (ValueError, tk.TclError) as e:
+            messagebox.showerror("Error", f"Invalid input: {e}")
             return
 
+        # A newer request supersedes (and cancels) the one in flight
+        job = self.scheduler.submit(params)
         self.is_generating = True
-        self.status_var.set("Generating...")
-
-        # Save UNDO
-        if self.current_playlist.tracks:
-            self.undo_stack.append(self.current_playlist.clone())
-
-        # Generate action clears redo
-        self.redo_stack.clear()
-
-        threading.Thread(target=self._generate_background, daemon=True).start()
+        self.status_var.set(f"Generating... (#{job.id})")
+
+    def _run_job(self, job):
+        """Worker thread: run one generation with its snapshot parameters"""
+        # Pressed before the client finished connecting
+        if not self.client_ready.wait(CLIENT_WAIT_SECONDS):
+            logger.warning("⚠ YouTube Music client not ready, generating in fallback mode")
+        return self.engine.generate(
+            **job.params,
+            progress=lambda tracks, done, total: self._deliver(("partial", job.id, tracks, done, total)),
+            cancel=job.cancel,
+            raise_errors=True
+        )
 
-    def _generate_background(self):
-        try:
-            playlist, query = self.engine.generate(
-                mood=self.mood_var.get(),
-                activity=self.act_var.get(),
-                time_of_day=self.time_var.get(),
-                genre=self.genre_var.get().strip() or None,
-                top_n=int(self.count_var.get())
-            )
-            self.result_queue.put(("ok", playlist, query))
-        except Exception as e:
-            self.result_queue.put(("err", str(e)))
+    def _on_job_done(self, job, result, error):
+        """Worker thread: hand the latest job's outcome to the Tk thread"""
+        if isinstance(error, UpstreamUnavailable):
+            self._deliver(("err", job.id, f"YouTube Music tidak tersedia:\n{error}"))
+        elif error is not None:
+            self._deliver(("err", job.id, str(error)))
+        else:
+            playlist, query = result
+            self._deliver(("ok", job.id, playlist, query))
 
     # ==========================================================
-    # QUEUE HANDLER
+    # RESULT DELIVERY (worker thread -> Tk thread)
     # ==========================================================
-    def _poll_queue(self):
+    def _post(self, event: str):
+        """Wake the Tk loop from any thread"""
         try:
-            item = self.result_queue.get_nowait()
-        except queue.Empty:
-            self.root.after(200, self._poll_queue)
-            return
-
-        if item[0] == "ok":
-            playlist, query = item[1], item[2]
-            self._apply_playlist(playlist)
-            self.status_var.set(f"✓ {query}")
-        else:
-            messagebox.showerror("Error", item[1])
-            self.status_var.set("Error")
+            self.root.event_generate(event, when="tail")
+        except (tk.TclError, RuntimeError):
+            # Window already closed
+            pass
+
+    def _deliver(self, item):
+        self.result_queue.put(item)
+        self._post(RESULT_EVENT)
+
+    def _on_result(self, event=None):
+        """Tk thread: apply every queued result"""
+        while True:
+            try:
+                item = self.result_queue.get_nowait()
+            except queue.Empty:
+                return
 
-        self.is_generating = False
-        self.root.after(200, self._poll_queue)
+            kind, job_id = item[0], item[1]
+            if not self.scheduler.is_current(job_id):
+                # Superseded by a newer request
+                continue
+
+            if kind == "partial":
+                tracks, done, total = item[2], item[3], item[4]
+                self.playlist_view.set_tracks(tracks)
+                self.status_var.set(f"Generating... {done}/{total}")
+                continue
+
+            if kind == "ok":
+                playlist, query = item[2], item[3]
+                if playlist is None:
+                    # Drop provisional rows, keep the current playlist
+                    self._apply_playlist(self.current_playlist)
+                    self.status_var.set(f"✗ No tracks found: {query}")
+                else:
+                    # New state for undo (also clears redo)
+                    snapshot = self.history.push(playlist)
+                    self._apply_playlist(snapshot.to_playlist())
+                    self.status_var.set(f"✓ {query}")
+            else:
+                self._apply_playlist(self.current_playlist)
+                messagebox.showerror("Error", item[2])
+                self.status_var.set("Error")
+
+            self.is_generating = False
 
     # ==========================================================
     # APPLY PLAYLIST
     # ==========================================================
     def _apply_playlist(self, playlist: Playlist):
         self.current_playlist = playlist
-        self.tree.delete(*self.tree.get_children())
-
-        for i, track in enumerate(playlist.tracks, 1):
-            self.tree.insert("", "end", values=(i, track.title, track.channel, track.duration))
+        self.playlist_view.set_tracks(playlist.tracks)
 
     # ==========================================================
     # UNDO / REDO
     # ==========================================================
     def _undo(self):
 
-        if not self.undo_stack:
+        snapshot = self.history.undo()
+        if snapshot is None:
             messagebox.showinfo("Undo", "Tidak ada history untuk di-undo.")
             return
 
-        # Push current → redo
-        self.redo_stack.append(self.current_playlist.clone())
-
-        # Pop undo
-        self.current_playlist = self.undo_stack.pop()
-        self._apply_playlist(self.current_playlist)
+        self._apply_playlist(snapshot.to_playlist())
         self.status_var.set("Undo applied")
 
     def _redo(self):
 
-        if not self.redo_stack:
+        snapshot = self.history.redo()
+        if snapshot is None:
             messagebox.showinfo("Redo", "Tidak ada history untuk di-redo.")
             return
 
-        # Push current → undo
-        self.undo_stack.append(self.current_playlist.clone())
-
-        # Pop redo
-        self.current_playlist = self.redo_stack.pop()
-        self._apply_playlist(self.current_playlist)
+        self._apply_playlist(snapshot.to_playlist())
         self.status_var.set("Redo applied")
 
     # ==========================================================
@@ -312,8 +383,11 @@ class SmartPlaylistGUI:
             messagebox.showwarning("Open", "Please select a track")
             return
 
-        idx = self.tree.index(sel[0])
-        track = self.current_playlist.tracks[idx]
+        track = self.playlist_view.track_at(sel[0])
+        if track is None:
+            return
+
+        import webbrowser
 
         if track.video_id:
             webbrowser.open(f"https://music.youtube.com/watch?v={track.video_id}")
@@ -357,14 +431,56 @@ class SmartPlaylistGUI:
             self.current_playlist.export_json(path)
             messagebox.showinfo("Saved", f"Playlist saved to:\n{path}")
 
+    def _save_as(self):
+        if not self.current_playlist.tracks:
+            messagebox.showwarning("Save", "Playlist empty")
+            return
+
+        os.makedirs("data/saved_playlists", exist_ok=True)
+
+        path = filedialog.asksaveasfilename(
+            defaultextension=".m3u8",
+            initialdir="data/saved_playlists",
+            filetypes=[
+                ("M3U8 playlist", "*.m3u8"),
+                ("CSV files", "*.csv"),
+                ("NDJSON files", "*.ndjson"),
+                ("JSON files", "*.json"),
+                ("Text files", "*.txt"),
+            ]
+        )
+        if path:
+            try:
+                self.current_playlist.export(path)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Save", f"Export failed:\n{e}")
+                return
+            messagebox.showinfo("Saved", f"Playlist saved to:\n{path}")
+
     # ==========================================================
     # VOICE COMMAND
     # ==========================================================
+    def _ensure_voice(self):
+        """Import speech_recognition and open the microphone on first use"""
+        if self.voice is None:
+            try:
+                from voice_handler import VoiceRecognizer
+                self.voice = VoiceRecognizer(self._voice_callback_from_thread)
+            except Exception as e:
+                logger.warning(f"⚠ Voice unavailable: {e}")
+                messagebox.showerror("Voice", f"Voice command unavailable:\n{e}")
+                return None
+        return self.voice
+
     def _on_voice_press(self, e):
+        if self._ensure_voice() is None:
+            return
         self.voice_btn.config(text="🎤 Listening...", bg=SPOTIFY_GREEN)
         self.voice.start_listening()
 
     def _on_voice_release(self, e):
+        if self.voice is None:
+            return
         self.voice_btn.config(text="🎤 Processing...", bg="#2e2e2e")
         self.voice.stop_listening()
 
@@ -373,9 +489,43 @@ class SmartPlaylistGUI:
             if not text:
                 return
             if "buat" in text.lower() or "generate" in text.lower():
-                self._start_generate_thread()
+                self._start_generate()
+        self.root.after(0, apply)
+
+    # ==========================================================
+    # STARTUP (client connect after first frame)
+    # ==========================================================
+    def _on_first_frame(self):
+        if self.timer is not None:
+            self.timer.mark("first_frame")
+        if not self.client_ready.is_set():
+            threading.Thread(target=self._connect_client, name="ytm-connect", daemon=True).start()
+
+    def _connect_client(self):
+        start = time.perf_counter()
+        try:
+            client = self.client_factory()
+            self.engine.attach_client(client)
+            self.yt_client = client
+            status = "Ready"
+        except Exception as e:
+            logger.warning(f"⚠ YTMusic init failed: {e}")
+            status = "Offline (fallback mode)"
+        finally:
+            if self.timer is not None:
+                self.timer.record("client_init", time.perf_counter() - start)
+            self.client_ready.set()
+
+        # Import NumPy-backed ranking / dedupe off the Tk thread
+        self.engine.warm_up()
+
+        def apply():
+            if not self.is_generating:
+                self.status_var.set(status)
         self.root.after(0, apply)
 
     # RUN
     def run(self):
+        # Idle callbacks run after the pending redraws of the initial layout
+        self.root.after_idle(self._on_first_frame)
         self.root.mainloop()
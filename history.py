@@ -0,0 +1,190 @@
+import logging
+import sys
+import weakref
+from collections import deque
+from typing import Deque, Iterable, List, Optional, Tuple
+
+from models import Playlist, Track
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64
+
+
+class Snapshot:
+    """Immutable playlist state: name plus a tuple of track chunks
+
+    Chunks are tuples of shared Track objects; a snapshot reuses every
+    chunk of its predecessor that did not change, so it only owns the
+    parts of the playlist that differ. Tracks are shared between
+    snapshots and playlists and must be treated as read-only.
+    """
+
+    __slots__ = ("name", "chunks", "size", "nbytes")
+
+    def __init__(self, name: str, chunks: Tuple[tuple, ...], nbytes: int):
+        self.name = name
+        self.chunks = chunks
+        self.size = sum(len(c) for c in chunks)
+        self.nbytes = nbytes
+
+    def tracks(self) -> List[Track]:
+        return [track for chunk in self.chunks for track in chunk]
+
+    def to_playlist(self) -> Playlist:
+        return Playlist(self.name, self.tracks())
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"Snapshot(name={self.name!r}, tracks={self.size}, bytes={self.nbytes})"
+
+
+def _track_bytes(track: Track) -> int:
+    """Approximate memory held by one Track and its strings"""
+    size = sys.getsizeof(track)
+    for name in Track.SLOTS:
+        value = getattr(track, name)
+        if type(value) is str:
+            size += sys.getsizeof(value)
+    return size
+
+
+class PlaylistHistory:
+    """Bounded undo/redo history of structurally shared snapshots
+
+    push/undo/redo are O(1) stack moves (push also costs O(changed chunks)
+    to build the new snapshot). Equal tracks are interned to one shared
+    instance, and the oldest undo states are dropped once either the
+    depth or the approximate byte budget is exceeded.
+    """
+
+    def __init__(self, max_depth: int = 50, max_bytes: int = 32 * 1024 * 1024, chunk_size: int = CHUNK_SIZE):
+        """
+        Initialize history
+
+        Args:
+            max_depth: Max undo states kept (0 = unlimited)
+            max_bytes: Approximate memory budget for undo + redo states (0 = unlimited)
+            chunk_size: Tracks per shared chunk
+        """
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.chunk_size = max(1, chunk_size)
+
+        self.current: Optional[Snapshot] = None
+        self._undo: Deque[Snapshot] = deque()
+        self._redo: List[Snapshot] = []
+        self._bytes = 0
+
+        # Value -> shared Track; entries vanish once no snapshot uses them
+        self._tracks: "weakref.WeakValueDictionary[tuple, Track]" = weakref.WeakValueDictionary()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def push(self, playlist: Playlist) -> Snapshot:
+        """Record a new current state; clears redo"""
+        snapshot = self._snapshot(playlist.name, playlist.tracks, self.current)
+        if self.current is not None:
+            self._undo.append(self.current)
+            self._bytes += self.current.nbytes
+        for dropped in self._redo:
+            self._bytes -= dropped.nbytes
+        self._redo.clear()
+        self.current = snapshot
+        self._enforce_budget()
+        return snapshot
+
+    def undo(self) -> Optional[Snapshot]:
+        """Step back one state (None when nothing to undo)"""
+        if not self._undo:
+            return None
+        self._redo.append(self.current)
+        self.current = self._undo.pop()
+        self._bytes += self._redo[-1].nbytes - self.current.nbytes
+        return self.current
+
+    def redo(self) -> Optional[Snapshot]:
+        """Step forward one state (None when nothing to redo)"""
+        if not self._redo:
+            return None
+        self._undo.append(self.current)
+        self.current = self._redo.pop()
+        self._bytes += self._undo[-1].nbytes - self.current.nbytes
+        return self.current
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def clear(self):
+        self.current = None
+        self._undo.clear()
+        self._redo.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "undo": len(self._undo),
+            "redo": len(self._redo),
+            "bytes": self._bytes,
+            "shared_tracks": len(self._tracks),
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _intern(self, track: Track) -> Tuple[Track, int]:
+        """Shared instance for `track` and the bytes it newly costs"""
+        key = tuple(getattr(track, name) for name in Track.SLOTS)
+        shared = self._tracks.get(key)
+        if shared is not None:
+            return shared, 0
+        self._tracks[key] = track
+        return track, _track_bytes(track)
+
+    def _snapshot(self, name: str, tracks: Iterable[Track], previous: Optional[Snapshot]) -> Snapshot:
+        """Build a snapshot, reusing unchanged chunks of `previous`"""
+        shared: List[Track] = []
+        nbytes = 0
+        for track in tracks:
+            track, cost = self._intern(track)
+            shared.append(track)
+            nbytes += cost
+
+        old_chunks = previous.chunks if previous is not None else ()
+        chunks = []
+        reused = 0
+        for index, start in enumerate(range(0, len(shared), self.chunk_size)):
+            chunk = tuple(shared[start:start + self.chunk_size])
+            if index < len(old_chunks):
+                old = old_chunks[index]
+                if len(old) == len(chunk) and all(a is b for a, b in zip(old, chunk)):
+                    chunks.append(old)
+                    reused += 1
+                    continue
+            chunks.append(chunk)
+            nbytes += sys.getsizeof(chunk)
+
+        nbytes += sys.getsizeof(name) + 64
+        logger.debug(f"History snapshot: {len(shared)} tracks, {reused}/{len(chunks)} chunks shared")
+        return Snapshot(name, tuple(chunks), nbytes)
+
+    def _enforce_budget(self):
+        """Drop the oldest undo states until depth and byte budget fit"""
+        while self._undo and (
+            (self.max_depth and len(self._undo) > self.max_depth)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            dropped = self._undo.popleft()
+            self._bytes -= dropped.nbytes
+            logger.debug(f"History: dropped oldest state ({dropped.size} tracks)")
+
+    def __repr__(self) -> str:
+        return f"PlaylistHistory(undo={len(self._undo)}, redo={len(self._redo)}, bytes={self._bytes})"
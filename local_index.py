@@ -0,0 +1,301 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from heapq import nlargest
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from exporters import atomic_write
+from models import Track
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = "data/cache/local_index.json"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens"""
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class LocalIndex:
+    """Incremental inverted index with BM25 ranking over parsed tracks
+
+    Each document is one video_id; its terms are the title, the channel
+    and the words of every query that surfaced it. The index is
+    persisted as JSON (postings are rebuilt on load). At most `max_docs`
+    documents are kept, least recently refreshed evicted first, and
+    autosaves run on a debounced background thread so searches never
+    wait for serialization.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = INDEX_PATH,
+        k1: float = 1.2,
+        b: float = 0.75,
+        autosave_every: int = 500,
+        max_docs: int = 20000,
+        save_delay: float = 5.0
+    ):
+        """
+        Initialize index
+
+        Args:
+            path: JSON file to load from / save to (None = memory only)
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+            autosave_every: Save after this many document updates (0 = never)
+            max_docs: Documents (and remembered queries) kept, LRU by refresh
+            save_delay: Seconds an autosave waits, so bursts of updates share one write
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.autosave_every = autosave_every
+        self.max_docs = max(1, max_docs)
+        self.save_delay = save_delay
+
+        # Both ordered oldest refresh first
+        self.docs: "OrderedDict[str, dict]" = OrderedDict()
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.total_len = 0
+        self.query_seen: "OrderedDict[str, float]" = OrderedDict()
+
+        self._dirty = 0
+        self._lock = threading.RLock()
+        self._save_timer: Optional[threading.Timer] = None
+        # Serializes writers, so a final save() waits for a running autosave
+        self._save_lock = threading.Lock()
+
+        if self.path:
+            self.load()
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+    def add_tracks(self, tracks: Iterable[Track], query: str = ""):
+        """Index (or refresh) tracks surfaced by `query`"""
+        query_terms = tokenize(query)
+        now = time.time()
+
+        with self._lock:
+            for track in tracks:
+                if track and track.video_id:
+                    self._add(track, query_terms, now)
+            if query_terms:
+                key = " ".join(query_terms)
+                self.query_seen[key] = now
+                self.query_seen.move_to_end(key)
+            self._evict()
+            if self.autosave_every and self._dirty >= self.autosave_every:
+                self._schedule_save()
+
+    def _add(self, track: Track, query_terms: List[str], now: float):
+        """Insert/update one document (caller holds lock)"""
+        doc_id = track.video_id
+        doc = self.docs.get(doc_id)
+        queries = set(doc["queries"]) if doc else set()
+        queries.update(query_terms)
+
+        if doc:
+            self._unindex(doc_id, doc)
+            del self.docs[doc_id]
+
+        terms: Dict[str, int] = {}
+        for term in tokenize(track.title) + tokenize(track.channel) + sorted(queries):
+            terms[term] = terms.get(term, 0) + 1
+
+        doc = {
+            "track": track.to_dict(),
+            "queries": sorted(queries),
+            "terms": terms,
+            "len": sum(terms.values()),
+            "updated": now,
+        }
+        self.docs[doc_id] = doc
+        self._index(doc_id, doc)
+        self._dirty += 1
+
+    def _evict(self):
+        """Drop the least recently refreshed documents and queries over max_docs (caller holds lock)"""
+        while len(self.docs) > self.max_docs:
+            doc_id, doc = self.docs.popitem(last=False)
+            self._unindex(doc_id, doc)
+            self._dirty += 1
+        while len(self.query_seen) > self.max_docs:
+            self.query_seen.popitem(last=False)
+
+    def _index(self, doc_id: str, doc: dict):
+        for term, tf in doc["terms"].items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        self.total_len += doc["len"]
+
+    def _unindex(self, doc_id: str, doc: dict):
+        for term in doc["terms"]:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_len -= doc["len"]
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        max_age: Optional[float] = None,
+        min_match: float = 0.0
+    ) -> List[Tuple[Track, float]]:
+        """
+        BM25 search
+
+        Args:
+            query: Free-text query
+            limit: Max results
+            max_age: Ignore documents not refreshed within this many seconds
+            min_match: Minimum fraction of distinct query terms a document must contain
+
+        Returns:
+            List of (Track, score), best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        cutoff = time.time() - max_age if max_age is not None else None
+
+        with self._lock:
+            n_docs = len(self.docs)
+            if not n_docs:
+                return []
+            avg_len = self.total_len / n_docs
+
+            scores: Dict[str, float] = {}
+            matched: Dict[str, int] = {}
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                df = len(posting)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in posting.items():
+                    doc_len = self.docs[doc_id]["len"]
+                    norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * doc_len / avg_len))
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+                    matched[doc_id] = matched.get(doc_id, 0) + 1
+
+            need = min_match * len(terms)
+            candidates = (
+                (doc_id, score) for doc_id, score in scores.items()
+                if matched[doc_id] >= need
+                and (cutoff is None or self.docs[doc_id]["updated"] >= cutoff)
+            )
+            top = nlargest(limit, candidates, key=lambda item: item[1])
+            return [(Track(**self.docs[doc_id]["track"]), score) for doc_id, score in top]
+
+    def query_age(self, query: str) -> Optional[float]:
+        """Seconds since `query` last fetched upstream results (None = never)"""
+        seen = self.query_seen.get(" ".join(tokenize(query)))
+        return None if seen is None else time.time() - seen
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def load(self):
+        """Load documents from disk and rebuild postings"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError(f"expected an object, got {type(data).__name__}")
+            docs = data.get("docs") or {}
+            query_seen = data.get("query_seen") or {}
+            if not isinstance(docs, dict) or not isinstance(query_seen, dict):
+                raise ValueError("docs and query_seen must be objects")
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠ Failed to load local index {self.path}: {e}")
+            return
+
+        with self._lock:
+            self.docs = OrderedDict()
+            self.postings = {}
+            self.total_len = 0
+            skipped = 0
+            for doc_id, doc in docs.items():
+                if not self._valid_doc(doc):
+                    skipped += 1
+                    continue
+                self.docs[doc_id] = doc
+                self._index(doc_id, doc)
+            self.query_seen = OrderedDict(
+                (query, seen) for query, seen in query_seen.items() if isinstance(seen, (int, float))
+            )
+            self._evict()
+            self._dirty = 0
+
+        if skipped:
+            logger.warning(f"⚠ Skipped {skipped} malformed local index entries")
+        logger.info(f"✓ Local index loaded: {len(self.docs)} tracks, {len(self.postings)} terms")
+
+    @staticmethod
+    def _valid_doc(doc) -> bool:
+        """Shape check for a document read from disk"""
+        return (
+            isinstance(doc, dict)
+            and isinstance(doc.get("track"), dict)
+            and isinstance(doc.get("queries"), list)
+            and isinstance(doc.get("terms"), dict)
+            and all(isinstance(tf, int) for tf in doc["terms"].values())
+            and isinstance(doc.get("len"), int)
+            and isinstance(doc.get("updated"), (int, float))
+        )
+
+    def _schedule_save(self):
+        """Start a debounced background save unless one is pending (caller holds lock)"""
+        if not self.path or self._save_timer is not None:
+            return
+        self._save_timer = threading.Timer(self.save_delay, self.save)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def save(self):
+        """Atomically write the index to disk (also flushes a pending autosave)"""
+        if not self.path:
+            return
+
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                # Documents are replaced, never mutated, so shallow copies are
+                # a consistent snapshot; serializing happens outside the lock
+                docs = dict(self.docs)
+                query_seen = dict(self.query_seen)
+                self._dirty = 0
+
+            try:
+                with atomic_write(self.path) as f:
+                    json.dump({"version": 1, "docs": docs, "query_seen": query_seen}, f, ensure_ascii=False)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"⚠ Failed to save local index: {e}")
+
+    def __repr__(self) -> str:
+        return f"LocalIndex(tracks={len(self.docs)}, terms={len(self.postings)})"
@@ -1,8 +1,8 @@
+from startup import StartupTimer
+
 import sys
 import os
 import logging
-from tkinter import messagebox
-import tkinter as tk
 
 # Setup logging
 logging.basicConfig(
@@ -11,10 +11,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Import modules
-from ytm_client import YTMusicClient
-from recommender import RecommenderEngine
-from gui import SmartPlaylistGUI
+timer = StartupTimer()
 
 
 def create_directories():
@@ -29,7 +26,19 @@ def create_directories():
 
 
 def main():
-    """Main entry point"""
+    """Main entry point (GUI)"""
+    # Import modules (heavy dependencies -- ytmusicapi, NumPy, Pillow, speech_recognition --
+    # are imported lazily on first use; tkinter only on the GUI path)
+    with timer.phase("import"):
+        from tkinter import messagebox
+        import tkinter as tk
+        from ytm_client import YTMusicClient
+        from cache import SearchCache
+        from transport import guard_for, transport_from_env
+        from recommender import RecommenderEngine
+        from gui import SmartPlaylistGUI
+        from metrics import METRICS
+
     logger.info("="*60)
     logger.info("SmartPlaylist Premium - Starting")
     logger.info("="*60)
@@ -37,18 +46,16 @@ def main():
     # Create directories
     create_directories()
 
-    # Initialize YouTube Music client
-    ytm = None
-    try:
-        ytm = YTMusicClient()
+    # YouTube Music client is connected in the background once the window is up
+    def connect():
+        transport = transport_from_env()
+        ytm = YTMusicClient(cache=SearchCache("data/cache"), client=transport, guard=guard_for(transport))
         logger.info("✓ YouTube Music client initialized")
-    except Exception as e:
-        logger.warning(f"⚠ YTMusic init failed: {e}")
-        logger.info("Running in fallback mode")
+        return ytm
 
     # Initialize recommender
     try:
-        engine = RecommenderEngine(ytm)
+        engine = RecommenderEngine()
         logger.info("✓ Recommender engine initialized")
     except Exception as e:
         logger.critical(f"✗ Recommender init failed: {e}")
@@ -59,9 +66,11 @@ def main():
         sys.exit(1)
 
     # Start GUI
+    app = None
     try:
         logger.info("Starting GUI...")
-        app = SmartPlaylistGUI(recommender=engine, ytm_client=ytm)
+        with timer.phase("gui_build"):
+            app = SmartPlaylistGUI(recommender=engine, client_factory=connect, timer=timer)
         app.run()
     except Exception as e:
         logger.critical(f"✗ GUI error: {e}", exc_info=True)
@@ -74,10 +83,30 @@ def main():
             pass
         sys.exit(1)
 
+    if app is not None and app.yt_client is not None:
+        app.yt_client.index.save()
+
+    # SMARTPLAYLIST_METRICS=path.json|path.prom dumps per-stage timings and counters
+    metrics_path = os.environ.get("SMARTPLAYLIST_METRICS")
+    if metrics_path:
+        try:
+            METRICS.write(metrics_path)
+        except OSError as e:
+            logger.warning(f"⚠ Failed to write metrics: {e}")
+
     logger.info("Application closed")
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        # Headless batch mode: never touches tkinter
+        from cli import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        # Headless HTTP service
+        from server import main as serve_main
+        sys.exit(serve_main(sys.argv[2:]))
+
     try:
         main()
     except KeyboardInterrupt:
@@ -0,0 +1,338 @@
+import bisect
+import cProfile
+import heapq
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "smartplaylist_"
+PROFILE_DIR = "data/benchmarks/profiles"
+
+# Latency buckets in seconds (upper bounds, +Inf implied)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.total = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and latency histograms
+
+    Kept deliberately small: one lock, plain dicts, no background
+    threads. Export as Prometheus text exposition format or as a JSON
+    snapshot (with bucket-estimated p50/p95/p99).
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add `value` to counter `name`"""
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one sample into histogram `name`"""
+        key = _labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(len(self.buckets) + 1)
+            hist.counts[index] += 1
+            hist.total += value
+            hist.count += 1
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        """Time the enclosed block into stage_seconds{stage=...}"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def _quantile(self, hist: _Histogram, q: float) -> Optional[float]:
+        """Upper bucket bound containing quantile q (None when empty)"""
+        if not hist.count:
+            return None
+        rank = q * hist.count
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), hist.counts):
+            running += count
+            if running >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        """JSON-serializable view of every metric"""
+        def series_name(key: LabelKey) -> str:
+            return ",".join(f"{k}={v}" for k, v in key)
+
+        with self._lock:
+            counters = {
+                name: {series_name(k): v for k, v in series.items()}
+                for name, series in self._counters.items()
+            }
+            gauges = {
+                name: {series_name(k): v for k, v in series.items()}
+                for name, series in self._gauges.items()
+            }
+            histograms = {}
+            for name, series in self._histograms.items():
+                histograms[name] = {}
+                for key, hist in series.items():
+                    p99 = self._quantile(hist, 0.99)
+                    histograms[name][series_name(key)] = {
+                        "count": hist.count,
+                        "sum": hist.total,
+                        "mean": hist.total / hist.count if hist.count else 0.0,
+                        "p50": self._quantile(hist, 0.50),
+                        "p95": self._quantile(hist, 0.95),
+                        "p99": None if p99 == float("inf") else p99,
+                        "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], hist.counts)),
+                    }
+        return {"timestamp": time.time(), "counters": counters, "gauges": gauges, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+
+        def header(name: str, kind: str):
+            full = PREFIX + _NAME_RE.sub("_", name)
+            if name in self._help:
+                lines.append(f"# HELP {full} {self._help[name]}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = header(name, "counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {value:g}")
+
+            for name, series in sorted(self._gauges.items()):
+                full = header(name, "gauge")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {value:g}")
+
+            for name, series in sorted(self._histograms.items()):
+                full = header(name, "histogram")
+                for key, hist in sorted(series.items()):
+                    running = 0
+                    for bound, count in zip(self.buckets, hist.counts):
+                        running += count
+                        lines.append(f"{full}_bucket{_format_labels(key, [('le', f'{bound:g}')])} {running}")
+                    lines.append(f"{full}_bucket{_format_labels(key, [('le', '+Inf')])} {hist.count}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {hist.total:.6f}")
+                    lines.append(f"{full}_count{_format_labels(key)} {hist.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> str:
+        """Atomically write a .json snapshot or Prometheus text (any other extension)"""
+        from exporters import atomic_write
+
+        if path.lower().endswith(".json"):
+            payload = json.dumps(self.snapshot(), indent=2)
+        else:
+            payload = self.to_prometheus()
+        with atomic_write(path) as f:
+            f.write(payload)
+        logger.info(f"✓ Metrics written to {path}")
+        return path
+
+    def __repr__(self) -> str:
+        return (
+            f"MetricsRegistry(counters={len(self._counters)}, gauges={len(self._gauges)}, "
+            f"histograms={len(self._histograms)})"
+        )
+
+
+class RequestProfiler:
+    """Opt-in cProfile/tracemalloc capture that keeps the N slowest requests
+
+    Disabled unless `keep` > 0 (SMARTPLAYLIST_PROFILE=N). Only one request
+    is profiled at a time; concurrent requests run unprofiled rather than
+    fighting over the interpreter's profiler hook. For each of the N
+    slowest requests seen so far a .prof file (load with pstats or
+    snakeviz) and, with tracemalloc on, a -mem.txt top-allocations
+    report are kept in `out_dir`.
+    """
+
+    def __init__(self, keep: int = 0, trace_memory: bool = False, out_dir: str = PROFILE_DIR, top_allocations: int = 25):
+        self.keep = max(0, keep)
+        self.trace_memory = trace_memory
+        self.out_dir = out_dir
+        self.top_allocations = top_allocations
+        self._slowest: List[Tuple[float, str]] = []    # min-heap of (seconds, base path)
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RequestProfiler":
+        try:
+            keep = int(os.environ.get("SMARTPLAYLIST_PROFILE", "0") or 0)
+        except ValueError:
+            keep = 0
+        trace = os.environ.get("SMARTPLAYLIST_TRACEMALLOC", "").lower() in ("1", "true", "yes")
+        return cls(keep=keep, trace_memory=trace)
+
+    @property
+    def enabled(self) -> bool:
+        return self.keep > 0
+
+    @contextmanager
+    def profile(self, name: str):
+        """Profile the enclosed request if enabled and no other is being profiled"""
+        if not self.enabled or not self._busy.acquire(blocking=False):
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        started_tracing = False
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) owns the hook
+            profiler = None
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            elapsed = time.perf_counter() - start
+            memory = None
+            if self.trace_memory and tracemalloc.is_tracing():
+                memory = tracemalloc.take_snapshot()
+                if started_tracing:
+                    tracemalloc.stop()
+            try:
+                if profiler is not None:
+                    self._record(name, elapsed, profiler, memory)
+            finally:
+                self._busy.release()
+
+    def _record(self, name: str, elapsed: float, profiler: cProfile.Profile, memory):
+        with self._lock:
+            if len(self._slowest) >= self.keep and elapsed <= self._slowest[0][0]:
+                return
+            os.makedirs(self.out_dir, exist_ok=True)
+            slug = _NAME_RE.sub("_", name)[:60]
+            base = os.path.join(self.out_dir, f"{int(elapsed * 1000):07d}ms-{int(time.time())}-{slug}")
+
+            pstats.Stats(profiler).dump_stats(f"{base}.prof")
+            if memory is not None:
+                with open(f"{base}-mem.txt", "w", encoding="utf-8") as f:
+                    for stat in memory.statistics("lineno")[:self.top_allocations]:
+                        f.write(f"{stat}\n")
+
+            heapq.heappush(self._slowest, (elapsed, base))
+            while len(self._slowest) > self.keep:
+                _, evicted = heapq.heappop(self._slowest)
+                for suffix in (".prof", "-mem.txt"):
+                    try:
+                        os.remove(evicted + suffix)
+                    except OSError:
+                        pass
+        logger.info(f"⏱ Profiled slow request '{name}' ({elapsed * 1000:.0f} ms) -> {base}.prof")
+
+    def slowest(self) -> List[Tuple[float, str]]:
+        """(seconds, base path) of kept profiles, slowest first"""
+        with self._lock:
+            return sorted(self._slowest, reverse=True)
+
+
+# Process-wide defaults used by the pipeline
+METRICS = MetricsRegistry()
+PROFILER = RequestProfiler.from_env()
+
+METRICS.describe("stage_seconds", "Wall time per pipeline stage")
+METRICS.describe("api_calls_total", "Upstream YouTube Music calls")
+METRICS.describe("api_errors_total", "Failed upstream calls")
+METRICS.describe("cache_requests_total", "Search cache lookups by result")
+METRICS.describe("tracks_dropped_total", "Candidate tracks removed before ranking")
+METRICS.describe("generate_total", "generate() calls by outcome")
+METRICS.describe("parse_errors_total", "Search items that failed to parse")
+METRICS.describe("http_requests_total", "HTTP requests by route and status code")
+METRICS.describe("http_rejected_total", "HTTP requests refused with 429 (no free slot)")
+METRICS.describe("http_inflight", "HTTP requests currently inside the engine")
+METRICS.describe("ratelimit_rate", "Current adaptive upstream rate limit (calls/second)")
+METRICS.describe("ratelimit_throttled_total", "Rate-limit reductions caused by upstream throttling")
+METRICS.describe("ratelimit_rejected_total", "Calls refused after waiting too long for a rate-limit token")
+METRICS.describe("upstream_retries_total", "Upstream calls retried after a transient failure")
+METRICS.describe("circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)")
+METRICS.describe("circuit_transitions_total", "Circuit breaker state changes")
+METRICS.describe("circuit_rejected_total", "Calls failed fast while the circuit was open")
+METRICS.describe("stale_served_total", "Searches answered from expired cache because upstream failed")
+
+span = METRICS.span
+inc = METRICS.inc
+observe = METRICS.observe
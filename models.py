@@ -1,27 +1,226 @@
-from dataclasses import dataclass, asdict
-from typing import List, Optional
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Union
 from copy import deepcopy
-import json
-import os
+import sys
+
+URL_PREFIX = "https://music.youtube.com/watch?v="
+
+
+def parse_duration(text: Optional[str]) -> int:
+    """Parse "m:ss" / "h:mm:ss" into seconds (-1 when unknown)"""
+    if not text:
+        return -1
+    seconds = 0
+    try:
+        for part in str(text).strip().split(":"):
+            seconds = seconds * 60 + int(part)
+    except ValueError:
+        return -1
+    return seconds
+
+
+def format_duration(seconds: int) -> str:
+    """Format seconds as "m:ss" / "h:mm:ss" """
+    if seconds is None or seconds < 0:
+        return "0:00"
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
 
-@dataclass
 class Track:
-    title: str = ""
-    channel: str = ""
-    duration: str = ""
-    video_id: str = ""
-    playlist_id: str = ""
-    url: str = ""
-    result_type: str = ""
-    thumbnail: Optional[str] = None
+    """Compact track record: slotted, interned repeated strings, lazy URL"""
+
+    SLOTS = (
+        "title", "channel", "duration", "video_id",
+        "playlist_id", "_url", "result_type", "thumbnail", "seconds",
+    )
+    # __weakref__ lets history/caches share instances without pinning them
+    __slots__ = SLOTS + ("__weakref__",)
+
+    FIELDS = (
+        "title", "channel", "duration", "video_id",
+        "playlist_id", "url", "result_type", "thumbnail", "seconds",
+    )
+
+    def __init__(
+        self,
+        title: str = "",
+        channel: str = "",
+        duration: str = "",
+        video_id: str = "",
+        playlist_id: str = "",
+        url: str = "",
+        result_type: str = "",
+        thumbnail: Optional[str] = None,
+        seconds: Optional[int] = None
+    ):
+        self.title = title
+        self.channel = _intern(channel) if channel else channel
+        self.duration = duration
+        self.video_id = video_id
+        self.playlist_id = playlist_id
+        self.result_type = _intern(result_type) if result_type else result_type
+        self.thumbnail = thumbnail
+        # Duration in seconds (-1 = unknown), parsed once when not supplied
+        self.seconds = parse_duration(duration) if seconds is None else seconds
+        # Only store URLs that cannot be derived from video_id
+        self._url = url if url and url != URL_PREFIX + video_id else None
+
+    @property
+    def url(self) -> str:
+        """Watch URL, derived from video_id unless explicitly overridden"""
+        if self._url is not None:
+            return self._url
+        return URL_PREFIX + self.video_id if self.video_id else ""
+
+    @url.setter
+    def url(self, value: str):
+        self._url = value if value and value != URL_PREFIX + self.video_id else None
 
     def to_dict(self):
-        return asdict(self)
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._values() == other._values()
+
+    __hash__ = None
+
+    def __copy__(self):
+        clone = Track.__new__(Track)
+        for name in self.SLOTS:
+            setattr(clone, name, getattr(self, name))
+        return clone
+
+    def __deepcopy__(self, memo):
+        # Every field is an immutable str/None, so a shallow copy is a deep copy
+        return self.__copy__()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"Track({fields})"
+
+
+class TrackTable:
+    """Columnar track storage: parallel arrays plus a shared string pool
+
+    Repeated strings (channel, duration, result_type, playlist_id) are
+    stored once in the pool and referenced by index. Rows are
+    materialised as Track objects only when accessed, so a Playlist can
+    wrap a large table without holding one object per track.
+    """
+
+    def __init__(self, tracks: Optional[Iterable[Track]] = None):
+        self._pool: List[Optional[str]] = []
+        self._pool_index: Dict[Optional[str], int] = {}
+
+        self.titles: List[str] = []
+        self.video_ids: List[str] = []
+        self.thumbnails: List[Optional[str]] = []
+        self.channels = array("I")
+        self.durations = array("I")
+        self.playlist_ids = array("I")
+        self.result_types = array("I")
+        self.seconds = array("i")
+        # Sparse per-row URL overrides (most URLs derive from video_id)
+        self.url_overrides: Dict[int, str] = {}
+
+        if tracks is not None:
+            self.extend(tracks)
+
+    def _ref(self, value: Optional[str]) -> int:
+        idx = self._pool_index.get(value)
+        if idx is None:
+            idx = len(self._pool)
+            self._pool.append(value)
+            self._pool_index[value] = idx
+        return idx
+
+    def append(self, track: Track):
+        row = len(self.titles)
+        self.titles.append(track.title)
+        self.video_ids.append(track.video_id)
+        self.thumbnails.append(track.thumbnail)
+        self.channels.append(self._ref(track.channel))
+        self.durations.append(self._ref(track.duration))
+        self.playlist_ids.append(self._ref(track.playlist_id))
+        self.result_types.append(self._ref(track.result_type))
+        self.seconds.append(track.seconds)
+        if track._url is not None:
+            self.url_overrides[row] = track._url
+
+    def extend(self, tracks: Iterable[Track]):
+        for track in tracks:
+            self.append(track)
+
+    def row(self, i: int) -> Track:
+        """Materialise row i as a Track"""
+        pool = self._pool
+        return Track(
+            title=self.titles[i],
+            channel=pool[self.channels[i]],
+            duration=pool[self.durations[i]],
+            video_id=self.video_ids[i],
+            playlist_id=pool[self.playlist_ids[i]],
+            url=self.url_overrides.get(i, ""),
+            result_type=pool[self.result_types[i]],
+            thumbnail=self.thumbnails[i],
+            seconds=self.seconds[i]
+        )
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def __getitem__(self, key: Union[int, slice]):
+        if isinstance(key, slice):
+            return TrackTable(self.row(i) for i in range(*key.indices(len(self))))
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("TrackTable index out of range")
+        return self.row(key)
+
+    def __iter__(self) -> Iterator[Track]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def to_tracks(self) -> List[Track]:
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        clone = TrackTable.__new__(TrackTable)
+        clone._pool = list(self._pool)
+        clone._pool_index = dict(self._pool_index)
+        clone.titles = list(self.titles)
+        clone.video_ids = list(self.video_ids)
+        clone.thumbnails = list(self.thumbnails)
+        clone.channels = array("I", self.channels)
+        clone.durations = array("I", self.durations)
+        clone.playlist_ids = array("I", self.playlist_ids)
+        clone.result_types = array("I", self.result_types)
+        clone.seconds = array("i", self.seconds)
+        clone.url_overrides = dict(self.url_overrides)
+        return clone
+
+    def __repr__(self) -> str:
+        return f"TrackTable(rows={len(self)}, pooled_strings={len(self._pool)})"
+
 
 class Playlist:
-    def __init__(self, name: str = "Playlist", tracks: Optional[List[Track]] = None):
+    def __init__(self, name: str = "Playlist", tracks: Optional[Union[List[Track], TrackTable]] = None):
         self.name = name
-        self.tracks: List[Track] = tracks if tracks else []
+        self.tracks: Union[List[Track], TrackTable] = tracks if tracks else []
 
     def add(self, track: Track):
         self.tracks.append(track)
@@ -29,15 +228,13 @@ class Playlist:
     def clone(self):
         return deepcopy(self)
 
+    def export(self, path: str, fmt: Optional[str] = None) -> int:
+        """Stream tracks to path atomically; format inferred from extension"""
+        from exporters import export_tracks
+        return export_tracks(self.tracks, path, fmt=fmt, name=self.name)
+
     def export_txt(self, path: str):
-        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(f"{self.name}\n\n")
-            for i, t in enumerate(self.tracks, 1):
-                f.write(f"{i}. {t.title} - {t.channel} ({t.duration})\n{t.url}\n\n")
+        self.export(path, fmt="txt")
 
     def export_json(self, path: str):
-        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-        data = {"name": self.name, "tracks": [t.to_dict() for t in self.tracks]}
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        self.export(path, fmt="json")
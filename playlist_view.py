@@ -0,0 +1,251 @@
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Sequence
+
+import metrics
+from models import Track
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROW_HEIGHT = 20
+
+
+class PlaylistTreeView:
+    """Incremental, diff-based renderer for the playlist Treeview
+
+    Only the rows that fit the visible area (plus an overscan margin) are
+    inserted up front; further rows are added in chunks scheduled with
+    after() as the user scrolls towards the end, so the Tk main loop never
+    blocks on a large playlist. Replacing the playlist diffs the rows that
+    are already rendered and only touches the ones that changed.
+
+    Rendering is lazy rather than a recycled window: ttk.Treeview can only
+    scroll over rows that exist (and keeps selection per row), so rows stay
+    once inserted. That bounds the tree by the playlist size, which the
+    recommender caps at MAX_DEEP_TRACKS.
+
+    With a ThumbnailLoader attached, every thumbnail is queued as soon as
+    the playlist arrives, rows in view are bumped to the front of the
+    queue on scroll, and images are set on the #0 column as they land.
+
+    The "render" stage is timed from set_tracks() until the last chunk of
+    the initial view has been drawn.
+    """
+
+    def __init__(
+        self,
+        tree,
+        scrollbar=None,
+        chunk_size: int = 100,
+        overscan: int = 30,
+        prefetch: float = 0.85,
+        chunk_delay: int = 1,
+        thumbnails=None
+    ):
+        """
+        Attach to an existing Treeview
+
+        Args:
+            tree: ttk.Treeview with (No, Title, Channel, Duration) columns
+            scrollbar: Scrollbar driven by the tree (takes over yscrollcommand)
+            chunk_size: Rows inserted per after() callback
+            overscan: Extra rows rendered below the visible area
+            prefetch: Scroll position (0..1) at which the next chunk is loaded
+            chunk_delay: Milliseconds between chunks
+            thumbnails: Optional ThumbnailLoader for the #0 column
+        """
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.chunk_size = max(1, chunk_size)
+        self.overscan = max(0, overscan)
+        self.prefetch = prefetch
+        self.chunk_delay = chunk_delay
+        self.thumbnails = thumbnails
+
+        self.tracks: List[Track] = []
+        # Rendered rows as (values, thumbnail url)
+        self._rows: List[tuple] = []
+        self._rows_by_thumb: Dict[str, List[int]] = {}
+        self._target = 0
+        self._job: Optional[str] = None
+        self._render_started: Optional[float] = None
+
+        self.tree.configure(yscrollcommand=self._on_yscroll)
+        self.tree.bind("<Configure>", self._on_configure, add="+")
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def set_tracks(self, tracks: Sequence[Track]):
+        """Show `tracks`, updating only rows whose values changed"""
+        self._render_started = time.perf_counter()
+        self.tracks = list(tracks)
+        total = len(self.tracks)
+        rendered = len(self._rows)
+
+        self._rows_by_thumb = {}
+        for i, track in enumerate(self.tracks):
+            if track.thumbnail:
+                self._rows_by_thumb.setdefault(track.thumbnail, []).append(i)
+
+        updated = 0
+        for i in range(min(rendered, total)):
+            row = self._row(i)
+            old = self._rows[i]
+            if row != old:
+                self.tree.item(self._iid(i), values=row[0], image=self._image(row[1]))
+                if row[1] != old[1]:
+                    self._unpin(old[1])
+                    self._pin(row[1])
+                self._rows[i] = row
+                updated += 1
+
+        if rendered > total:
+            self.tree.delete(*[self._iid(i) for i in range(total, rendered)])
+            for row in self._rows[total:]:
+                self._unpin(row[1])
+            del self._rows[total:]
+
+        visible = self._visible_rows()
+        self._target = min(total, max(len(self._rows), visible + self.overscan))
+        self._request_thumbnails(visible)
+        logger.debug(f"Playlist view: {total} tracks, {updated} rows updated, {len(self._rows)} rendered")
+        self._schedule()
+        self._finish_render()
+
+    def clear(self):
+        self.set_tracks([])
+
+    def on_thumbnails_ready(self):
+        """Show images the loader finished (call on the Tk thread)"""
+        if self.thumbnails is None:
+            return
+        for url in self.thumbnails.drain():
+            image = self._image(url)
+            for i in self._rows_by_thumb.get(url, ()):
+                if i < len(self._rows):
+                    self.tree.item(self._iid(i), image=image)
+
+    def track_at(self, iid: str) -> Optional[Track]:
+        """Track shown in row `iid` (None if unknown)"""
+        try:
+            return self.tracks[self.tree.index(iid)]
+        except (IndexError, ValueError):
+            return None
+
+    @property
+    def rendered(self) -> int:
+        """Rows currently inserted in the tree"""
+        return len(self._rows)
+
+    @property
+    def pending(self) -> int:
+        """Rows not rendered yet"""
+        return len(self.tracks) - len(self._rows)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _iid(index: int) -> str:
+        return f"row{index}"
+
+    def _row(self, index: int) -> tuple:
+        track = self.tracks[index]
+        return (index + 1, track.title, track.channel, track.duration), track.thumbnail
+
+    def _image(self, url: Optional[str]):
+        """PhotoImage for the #0 column ("" = none yet)"""
+        if self.thumbnails is None:
+            return ""
+        return self.thumbnails.photo(url) or ""
+
+    def _pin(self, url: Optional[str]):
+        """Keep the loader from evicting an image a rendered row shows"""
+        if self.thumbnails is not None:
+            self.thumbnails.pin(url)
+
+    def _unpin(self, url: Optional[str]):
+        if self.thumbnails is not None:
+            self.thumbnails.unpin(url)
+
+    def _request_thumbnails(self, visible: int):
+        """Queue every thumbnail, rows in view first"""
+        if self.thumbnails is None:
+            return
+        self.thumbnails.reset()
+        for i, track in enumerate(self.tracks):
+            if track.thumbnail:
+                self.thumbnails.request(track.thumbnail, (0 if i < visible else 1, i))
+
+    def _bump_visible(self, first: float, last: float):
+        """Move thumbnails of rows in view to the front of the queue"""
+        if self.thumbnails is None or not self._rows:
+            return
+        start = int(first * len(self._rows))
+        end = min(len(self._rows), math.ceil(last * len(self._rows)))
+        for i in range(start, end):
+            url = self._rows[i][1]
+            if url:
+                self.thumbnails.request(url, (0, i))
+
+    def _visible_rows(self) -> int:
+        """Rows that fit the tree's current height"""
+        height = self.tree.winfo_height()
+        if height <= 1:
+            # Not mapped yet: fall back to the configured height in rows
+            try:
+                return int(self.tree.cget("height"))
+            except (TypeError, ValueError):
+                return self.chunk_size
+        try:
+            row_height = int(self.tree.tk.call("ttk::style", "lookup", "Treeview", "-rowheight") or 0)
+        except Exception:
+            row_height = 0
+        return height // (row_height or DEFAULT_ROW_HEIGHT) + 1
+
+    def _schedule(self):
+        if self._job is None and len(self._rows) < self._target:
+            self._job = self.tree.after(self.chunk_delay, self._render_chunk)
+
+    def _render_chunk(self):
+        """Insert the next chunk of rows, then reschedule"""
+        self._job = None
+        start = len(self._rows)
+        end = min(self._target, len(self.tracks), start + self.chunk_size)
+        with metrics.span("render_chunk"):
+            for i in range(start, end):
+                row = self._row(i)
+                self.tree.insert("", "end", iid=self._iid(i), values=row[0], image=self._image(row[1]))
+                self._rows.append(row)
+                self._pin(row[1])
+        self._schedule()
+        self._finish_render()
+
+    def _finish_render(self):
+        """Record the render stage once the initial view is fully drawn"""
+        if self._render_started is None or len(self._rows) < self._target:
+            return
+        metrics.observe("stage_seconds", time.perf_counter() - self._render_started, stage="render")
+        self._render_started = None
+
+    def _extend_target(self, rows: int):
+        target = min(len(self.tracks), rows)
+        if target > self._target:
+            self._target = target
+            self._schedule()
+
+    def _on_yscroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        self._bump_visible(float(first), float(last))
+        # Near the end of what is rendered: load the next chunk
+        if float(last) >= self.prefetch and self.pending > 0:
+            self._extend_target(len(self._rows) + self.chunk_size)
+
+    def _on_configure(self, event=None):
+        self._extend_target(self._visible_rows() + self.overscan)
+
+    def __repr__(self) -> str:
+        return f"PlaylistTreeView(tracks={len(self.tracks)}, rendered={len(self._rows)})"
@@ -0,0 +1,148 @@
+import logging
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from models import Track
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Title words that signal a good fit for each mood / activity
+KEYWORDS: Dict[str, Set[str]] = {
+    # moods
+    "chill": {"chill", "lofi", "lo", "fi", "relax", "relaxing", "calm", "mellow", "ambient", "acoustic", "soft"},
+    "energetic": {"energetic", "energy", "power", "hype", "pump", "edm", "rock", "upbeat", "bass"},
+    "happy": {"happy", "feel", "good", "sunny", "summer", "fun", "joy", "upbeat", "pop"},
+    "sad": {"sad", "heartbreak", "broken", "cry", "lonely", "melancholy", "tears", "ballad"},
+    "focus": {"focus", "concentration", "deep", "instrumental", "piano", "minimal", "ambient"},
+    "romantic": {"romantic", "love", "romance", "heart", "ballad", "jazz", "soul"},
+    "party": {"party", "dance", "club", "remix", "hits", "edm", "house"},
+    # activities
+    "study": {"study", "studying", "focus", "concentration", "lofi", "instrumental", "piano", "reading"},
+    "workout": {"workout", "gym", "training", "running", "run", "cardio", "motivation", "fitness"},
+    "relax": {"relax", "relaxing", "calm", "spa", "peaceful", "soothing", "meditation"},
+    "sleep": {"sleep", "sleeping", "lullaby", "night", "calm", "rain", "deep", "ambient"},
+    "commute": {"drive", "driving", "road", "trip", "travel", "commute", "ride"},
+    "work": {"work", "office", "coffee", "productivity", "focus", "background"},
+}
+
+# Preferred track length (seconds) per activity
+ACTIVITY_DURATION: Dict[str, Tuple[int, int]] = {
+    "study": (180, 900),
+    "workout": (150, 330),
+    "relax": (180, 600),
+    "sleep": (300, 3600),
+    "commute": (150, 330),
+    "work": (180, 600),
+}
+DEFAULT_DURATION = (150, 420)
+
+FEATURES = ("keyword", "duration", "channel_repeat", "source_rank")
+
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "keyword": 1.0,
+    "duration": 0.5,
+    "channel_repeat": -0.6,
+    "source_rank": 1.2,
+}
+
+
+class TrackRanker:
+    """Vectorized scoring and top-k selection of candidate tracks
+
+    Candidates become an (n x len(FEATURES)) feature matrix; the score is
+    a single matrix-vector product with the configured weights, and the
+    best top_n are taken with argpartition (O(n)) before a final sort.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, duration_scale: float = 120.0):
+        """
+        Initialize ranker
+
+        Args:
+            weights: Per-feature weights (missing names use DEFAULT_WEIGHTS)
+            duration_scale: Seconds outside the preferred range at which
+                duration fitness has decayed to 1/e
+        """
+        merged = dict(DEFAULT_WEIGHTS)
+        if weights:
+            unknown = set(weights) - set(FEATURES)
+            if unknown:
+                raise ValueError(f"Unknown ranking features: {sorted(unknown)}")
+            merged.update(weights)
+        self.weights = merged
+        self.duration_scale = duration_scale
+        self._weight_vector = np.array([merged[name] for name in FEATURES], dtype=np.float32)
+
+    @staticmethod
+    def _context(query: str) -> Tuple[Set[str], Tuple[int, int]]:
+        """Keyword set and preferred duration range implied by a query"""
+        tokens = _TOKEN_RE.findall(query.lower())
+        keywords = set(tokens) - {"music"}
+        duration = DEFAULT_DURATION
+        for token in tokens:
+            keywords |= KEYWORDS.get(token, set())
+            if token in ACTIVITY_DURATION:
+                duration = ACTIVITY_DURATION[token]
+        return keywords, duration
+
+    def features(self, tracks: Sequence[Track], query: str) -> np.ndarray:
+        """Build the (n x len(FEATURES)) float32 feature matrix"""
+        n = len(tracks)
+        keywords, (lo, hi) = self._context(query)
+        findall = _TOKEN_RE.findall
+
+        # Keyword overlap: matched title words, saturating at 3
+        overlap = np.fromiter(
+            (len(keywords.intersection(findall(t.title.lower()))) for t in tracks),
+            dtype=np.float32, count=n
+        )
+        keyword = np.minimum(overlap, 3.0) / 3.0
+
+        # Duration fitness: 1 inside [lo, hi], exponential decay outside,
+        # 0.5 when the duration is unknown
+        seconds = np.fromiter((t.seconds for t in tracks), dtype=np.float32, count=n)
+        distance = np.maximum(lo - seconds, 0) + np.maximum(seconds - hi, 0)
+        duration = np.exp(-distance / self.duration_scale)
+        duration[seconds <= 0] = 0.5
+
+        # Channel repetition: how many earlier candidates share the channel
+        _, codes = np.unique(np.array([t.channel for t in tracks], dtype=object), return_inverse=True)
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        group_start = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        group_sizes = np.diff(np.r_[group_start, n])
+        prior = np.empty(n, dtype=np.float32)
+        prior[order] = np.arange(n) - np.repeat(group_start, group_sizes)
+        channel_repeat = np.log1p(prior)
+
+        # Source rank: upstream / fused order, 1.0 for the first candidate
+        source_rank = 1.0 - np.arange(n, dtype=np.float32) / max(n - 1, 1)
+
+        return np.column_stack((keyword, duration, channel_repeat, source_rank)).astype(np.float32, copy=False)
+
+    def score(self, matrix: np.ndarray) -> np.ndarray:
+        """Weighted score per row"""
+        return matrix @ self._weight_vector
+
+    def select(self, tracks: Sequence[Track], top_n: int, query: str) -> List[Track]:
+        """Return the top_n best-scoring tracks, best first"""
+        n = len(tracks)
+        if n == 0 or top_n <= 0:
+            return []
+
+        scores = self.score(self.features(tracks, query))
+        k = min(top_n, n)
+        if k < n:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        # Highest score first; earlier candidates win ties
+        top = top[np.lexsort((top, -scores[top]))]
+        return [tracks[i] for i in top]
+
+    def __repr__(self) -> str:
+        return f"TrackRanker(weights={self.weights})"
@@ -1,18 +1,122 @@
 import logging
-from typing import Optional, Tuple, List
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from copy import deepcopy
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Tuple, List
+import metrics
+from duration_planner import plan_duration
 from models import Playlist, Track
 
 logger = logging.getLogger(__name__)
 
+# Placeholder for "build the default component on first use"
+_DEFAULT = object()
+
+# progress(provisional_tracks, done, total): done/total count tracks for deep
+# search pages and sub-queries for fan-out
+ProgressCallback = Callable[[List[Track], int, int], None]
+
+
+class GenerationCancelled(Exception):
+    """Raised inside generate() when its cancel event is set"""
+
+
+def _check_cancel(cancel: Optional[threading.Event]):
+    if cancel is not None and cancel.is_set():
+        raise GenerationCancelled()
+
+
+def _notify(progress: Optional[ProgressCallback], tracks: List[Track], done: int, total: int):
+    """Deliver a partial result; a failing callback never breaks generation"""
+    if progress is None:
+        return
+    try:
+        progress(tracks, done, total)
+    except Exception as e:
+        logger.warning(f"⚠ Progress callback failed: {e}")
+
+
+class _InflightCall:
+    """Shared result slot for one in-flight upstream search"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: List[Track] = []
+        self.error: Optional[BaseException] = None
+
+
+def rrf_merge(ranked_lists: Iterable[List[Track]], k: int = 60) -> List[Track]:
+    """
+    Reciprocal-rank fusion of several ranked track lists
+    
+    score(track) = sum over lists of 1 / (k + rank), rank starting at 1.
+    Tracks are deduplicated by video_id; the first occurrence is kept.
+    """
+    scores: Dict[str, float] = {}
+    first_seen: Dict[str, Track] = {}
+    
+    for ranked in ranked_lists:
+        seen_in_list = set()
+        for rank, track in enumerate(ranked, 1):
+            vid = track.video_id
+            if not vid or vid in seen_in_list:
+                continue
+            seen_in_list.add(vid)
+            scores[vid] = scores.get(vid, 0.0) + 1.0 / (k + rank)
+            if vid not in first_seen:
+                first_seen[vid] = track
+    
+    order = sorted(scores, key=scores.get, reverse=True)
+    return [first_seen[vid] for vid in order]
+
 
 class RecommenderEngine:
     """Intelligent playlist recommendation engine"""
     
-    def __init__(self, ytm_client=None):
+    MIN_TRACKS = 5
+    MAX_TRACKS = 50
+    MAX_DEEP_TRACKS = 2000
+    
+    # Candidate pool sizing for duration-targeted playlists
+    AVG_TRACK_SECONDS = 210
+    DURATION_POOL_FACTOR = 3
+    
+    def __init__(self, ytm_client=None, async_client=None, local_index=None, ranker=None):
         """Initialize recommender"""
         self.yt = ytm_client
+        self._async_yt = async_client
+        
+        # Candidate scoring (set to None to keep upstream order) and
+        # near-duplicate collapsing (None disables). The NumPy-backed
+        # defaults are built on first use so importing this module stays cheap.
+        self._ranker = ranker if ranker is not None else _DEFAULT
+        self._near_dedupe = _DEFAULT
+        
+        # Local BM25 index answered before going upstream
+        self.local_index = local_index if local_index is not None else getattr(ytm_client, "index", None)
+        self.use_local_index = True
+        self.local_max_age = 24 * 60 * 60
+        self.local_min_match = 1.0
         self._fallback_mode = ytm_client is None
         
+        # Single-flight state for identical concurrent requests
+        self._inflight: Dict[tuple, _InflightCall] = {}
+        self._inflight_lock = threading.Lock()
+        # event loop -> {request shape: future}; asyncio futures are loop-bound
+        self._async_inflight: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        
+        # Fan-out / reciprocal-rank fusion settings
+        self.rrf_k = 60
+        self.fan_out_workers = 4
+        self._fan_out_executor: Optional[ThreadPoolExecutor] = None
+        
+        # Deep search budget (per generate call)
+        self.deep_page_size = 50
+        self.deep_max_pages = 40
+        self.deep_time_budget = 30.0
+        self.coalesced_calls = 0
+        
         if self._fallback_mode:
             logger.warning("⚠ Recommender in fallback mode")
         else:
@@ -24,7 +128,14 @@ class RecommenderEngine:
         activity: str,
         time_of_day: str,
         genre: Optional[str] = None,
-        top_n: int = 10
+        top_n: int = 10,
+        deep: bool = False,
+        fan_out: bool = False,
+        target_seconds: Optional[int] = None,
+        tolerance: int = 60,
+        progress: Optional[ProgressCallback] = None,
+        cancel: Optional[threading.Event] = None,
+        raise_errors: bool = False
     ) -> Tuple[Optional[Playlist], str]:
         """
         Generate smart playlist with EXACT track count
@@ -35,17 +146,34 @@ class RecommenderEngine:
             time_of_day: Time of day
             genre: Optional music genre
             top_n: EXACT number of tracks to return
+            deep: Page through results for long playlists (up to MAX_DEEP_TRACKS)
+            fan_out: Search several sub-queries in parallel and merge them
+                with reciprocal-rank fusion
+            target_seconds: Fill this much listening time instead of a
+                track count (top_n is then ignored)
+            tolerance: Allowed deviation from target_seconds, in seconds
+            progress: Called from the generating thread with provisional
+                (unranked) tracks as deep-search pages or fan-out sub-queries
+                arrive; the returned playlist is the final result
+            cancel: Event checked before the upstream search, between
+                deep-search pages and fan-out sub-queries; once set,
+                GenerationCancelled is raised
+            raise_errors: Raise invalid-input, upstream and generation errors instead
+                of returning (None, query), so batch callers can tell
+                failures apart from empty results
             
         Returns:
             Tuple of (Playlist or None, search_query)
         """
         # Validate inputs
         if not mood or not activity or not time_of_day:
+            if raise_errors:
+                raise ValueError("Missing required parameters: mood, activity and time_of_day")
             logger.error("Missing required parameters")
             return None, ""
         
         # Clamp top_n to reasonable limits
-        top_n = max(5, min(top_n, 50))
+        top_n, deep = self._plan_count(top_n, deep, target_seconds)
         
         # Build query
         query = self._build_query(mood, activity, time_of_day, genre)
@@ -53,46 +181,523 @@ class RecommenderEngine:
         
         # Fallback mode
         if self._fallback_mode or not self.yt:
+            if raise_errors:
+                raise RuntimeError("No YouTube Music client available")
             logger.warning("No YouTube Music client available")
             return None, query
         
-        # Search tracks - request MORE than needed for deduplication
+        subqueries = self._build_subqueries(mood, activity, time_of_day, genre) if fan_out else ()
+        
         try:
-            # CRITICAL FIX: Request 2x tracks for deduplication buffer
-            search_limit = top_n * 2
-            logger.info(f"Searching with limit={search_limit} (will return {top_n})")
-            
-            results = self.yt.search_songs(query=query, limit=search_limit)
-            
-            if not results:
-                logger.warning(f"No results found for query: '{query}'")
-                return None, query
-            
-            logger.info(f"Found {len(results)} raw results")
-            
-            # Deduplicate by video_id
-            unique_tracks = self._deduplicate_tracks(results)
-            logger.info(f"After deduplication: {len(unique_tracks)} unique tracks")
+            with metrics.PROFILER.profile(f"generate {query}"), metrics.span("generate"):
+                _check_cancel(cancel)
+                with metrics.span("select"):
+                    selected_tracks = self._coalesced_select(query, top_n, deep, subqueries, progress, cancel)
+                _check_cancel(cancel)
+                if target_seconds:
+                    with metrics.span("duration_plan"):
+                        selected_tracks = plan_duration(selected_tracks, target_seconds, tolerance)
+                    top_n = len(selected_tracks)
+                playlist = self._build_playlist(selected_tracks, top_n, mood, activity, time_of_day, genre)
+            metrics.inc("generate_total", outcome="ok" if playlist else "empty")
+            return playlist, query
             
-            # CRITICAL FIX: Select EXACTLY top_n tracks
-            selected_tracks = unique_tracks[:top_n]
-            logger.info(f"Selected EXACTLY {len(selected_tracks)} tracks (requested: {top_n})")
+        except GenerationCancelled:
+            metrics.inc("generate_total", outcome="cancelled")
+            logger.info(f"Generation cancelled: query='{query}'")
+            raise
+        except Exception as e:
+            metrics.inc("generate_total", outcome="error")
+            if raise_errors:
+                raise
+            logger.error(f"✗ Playlist generation failed: {e}")
+            return None, query
+
+    async def generate_async(
+        self,
+        mood: str,
+        activity: str,
+        time_of_day: str,
+        genre: Optional[str] = None,
+        top_n: int = 10,
+        deep: bool = False,
+        fan_out: bool = False,
+        target_seconds: Optional[int] = None,
+        tolerance: int = 60,
+        raise_errors: bool = False
+    ) -> Tuple[Optional[Playlist], str]:
+        """
+        asyncio variant of generate() backed by AsyncYTMusicClient
+        
+        Identical concurrent requests on the same event loop share one
+        upstream search, like generate() does across threads.
+        """
+        if not mood or not activity or not time_of_day:
+            if raise_errors:
+                raise ValueError("Missing required parameters: mood, activity and time_of_day")
+            logger.error("Missing required parameters")
+            return None, ""
+        
+        top_n, deep = self._plan_count(top_n, deep, target_seconds)
+        
+        query = self._build_query(mood, activity, time_of_day, genre)
+        logger.info(f"🎵 Generating playlist (async): query='{query}', count={top_n}")
+        
+        if self._fallback_mode or not self.yt:
+            if raise_errors:
+                raise RuntimeError("No YouTube Music client available")
+            logger.warning("No YouTube Music client available")
+            return None, query
+        
+        subqueries = self._build_subqueries(mood, activity, time_of_day, genre) if fan_out else ()
+        
+        try:
+            selected_tracks = await self._coalesced_select_async(query, top_n, deep, subqueries)
+            if target_seconds:
+                with metrics.span("duration_plan"):
+                    selected_tracks = plan_duration(selected_tracks, target_seconds, tolerance)
+                top_n = len(selected_tracks)
+            playlist = self._build_playlist(selected_tracks, top_n, mood, activity, time_of_day, genre)
+            metrics.inc("generate_total", outcome="ok" if playlist else "empty")
+            return playlist, query
             
-            # Create playlist
+        except Exception as e:
+            metrics.inc("generate_total", outcome="error")
+            if raise_errors:
+                raise
+            logger.error(f"✗ Playlist generation failed: {e}")
+            return None, query
+
+    def _plan_count(self, top_n: int, deep: bool, target_seconds: Optional[int]) -> Tuple[int, bool]:
+        """
+        Resolve how many candidates to fetch and whether deep search is needed
+        
+        For duration targets the candidate pool is sized from an assumed
+        average track length, with headroom so the planner has choices.
+        """
+        if not target_seconds:
+            return self._clamp_count(top_n, deep), deep
+        
+        estimate = -(-int(target_seconds) // self.AVG_TRACK_SECONDS)
+        pool = max(self.MAX_TRACKS // 2, estimate * self.DURATION_POOL_FACTOR)
+        deep = deep or pool > self.MAX_TRACKS
+        return self._clamp_count(pool, deep), deep
+
+    def _clamp_count(self, top_n: int, deep: bool = False) -> int:
+        """Clamp requested track count to the supported range"""
+        max_n = self.MAX_DEEP_TRACKS if deep else self.MAX_TRACKS
+        return max(self.MIN_TRACKS, min(top_n, max_n))
+
+    def _build_playlist(
+        self,
+        selected_tracks: List[Track],
+        top_n: int,
+        mood: str,
+        activity: str,
+        time_of_day: str,
+        genre: Optional[str] = None
+    ) -> Optional[Playlist]:
+        """Wrap selected tracks into a named Playlist"""
+        if not selected_tracks:
+            return None
+        
+        # Create playlist
+        with metrics.span("playlist"):
             playlist_name = self._generate_playlist_name(mood, activity, time_of_day, genre)
             playlist = Playlist(name=playlist_name, tracks=selected_tracks)
+        
+        logger.info(f"✓ Generated playlist: '{playlist_name}' with {len(selected_tracks)} tracks")
+        
+        # Verify count matches
+        if len(selected_tracks) != top_n:
+            logger.warning(f"⚠ Track count mismatch! Expected {top_n}, got {len(selected_tracks)}")
+        
+        return playlist
+
+    def generate_many(
+        self,
+        specs: Iterable[Any],
+        max_workers: int = 8,
+        return_exceptions: bool = False
+    ) -> Iterator[Tuple[Any, Any, str]]:
+        """
+        Generate many playlists concurrently on a bounded thread pool
+        
+        Args:
+            specs: Iterable of generate() arguments, each either a mapping
+                (mood=..., activity=..., time_of_day=..., genre=..., top_n=...)
+                or a positional tuple (mood, activity, time_of_day[, genre[, top_n]])
+            max_workers: Max concurrent generations
+            return_exceptions: Yield the raised exception instead of None
+                in the playlist slot when a spec fails; a None playlist then
+                always means the search found nothing
             
-            logger.info(f"✓ Generated playlist: '{playlist_name}' with {len(selected_tracks)} tracks")
+        Yields:
+            (spec, Playlist or None/exception, search_query) as each spec finishes
+        """
+        max_workers = max(1, int(max_workers))
+        spec_iter = iter(specs)
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generate") as pool:
+            pending = {}
             
-            # Verify count matches
-            if len(selected_tracks) != top_n:
-                logger.warning(f"⚠ Track count mismatch! Expected {top_n}, got {len(selected_tracks)}")
+            def submit_next() -> bool:
+                try:
+                    spec = next(spec_iter)
+                except StopIteration:
+                    return False
+                pending[pool.submit(self._generate_spec, spec)] = spec
+                return True
             
-            return playlist, query
+            # Keep a bounded window of submitted work so huge spec lists
+            # are consumed lazily instead of queued all at once
+            for _ in range(max_workers * 2):
+                if not submit_next():
+                    break
             
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    spec = pending.pop(future)
+                    try:
+                        playlist, query = future.result()
+                    except Exception as e:
+                        logger.error(f"✗ Batch spec failed {spec!r}: {e}")
+                        playlist, query = (e if return_exceptions else None), ""
+                    yield spec, playlist, query
+                    submit_next()
+
+    def _generate_spec(self, spec: Any) -> Tuple[Optional[Playlist], str]:
+        """Call generate() with a mapping or positional spec, letting errors propagate"""
+        if isinstance(spec, Mapping):
+            return self.generate(**spec, raise_errors=True)
+        return self.generate(*spec, raise_errors=True)
+
+    def _coalesced_select(
+        self,
+        query: str,
+        top_n: int,
+        deep: bool = False,
+        subqueries: Tuple[str, ...] = (),
+        progress: Optional[ProgressCallback] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> List[Track]:
+        """
+        Run _select_tracks once per request shape across concurrent callers
+        
+        The first caller (leader) performs the upstream search; callers that
+        arrive while it is in flight wait for it and receive their own copy
+        (only the leader reports partial progress). If the leader is
+        cancelled, waiting callers retry instead of failing with it.
+        """
+        key = (query, top_n, deep, subqueries)
+        
+        with self._inflight_lock:
+            call = self._inflight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InflightCall()
+                self._inflight[key] = call
+            else:
+                self.coalesced_calls += 1
+        
+        if not is_leader:
+            logger.info(f"Joining in-flight search: query='{query}', count={top_n}")
+            call.done.wait()
+            if isinstance(call.error, GenerationCancelled):
+                return self._coalesced_select(query, top_n, deep, subqueries, progress, cancel)
+            if call.error is not None:
+                raise call.error
+            return deepcopy(call.result)
+        
+        selected: List[Track] = []
+        try:
+            selected = self._select_tracks(query, top_n, deep, subqueries, progress, cancel)
+            # Publish a snapshot nobody mutates; the leader keeps the original
+            call.result = deepcopy(selected)
         except Exception as e:
-            logger.error(f"✗ Playlist generation failed: {e}")
-            return None, query
+            call.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+        
+        return selected
+
+    async def _coalesced_select_async(
+        self,
+        query: str,
+        top_n: int,
+        deep: bool = False,
+        subqueries: Tuple[str, ...] = ()
+    ) -> List[Track]:
+        """
+        Async counterpart of _coalesced_select (per event loop)
+        
+        If the leader is cancelled, waiting callers retry instead of being
+        cancelled with it.
+        """
+        import asyncio
+
+        key = (query, top_n, deep, subqueries)
+        loop = asyncio.get_running_loop()
+        with self._inflight_lock:
+            inflight = self._async_inflight.get(loop)
+            if inflight is None:
+                inflight = self._async_inflight[loop] = {}
+        future = inflight.get(key)
+        
+        if future is not None:
+            self.coalesced_calls += 1
+            logger.info(f"Joining in-flight search: query='{query}', count={top_n}")
+            try:
+                return deepcopy(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    # The leader was cancelled, not us: start over
+                    return await self._coalesced_select_async(query, top_n, deep, subqueries)
+                raise
+        
+        future = loop.create_future()
+        inflight[key] = future
+        try:
+            # BM25 scoring and ranking are CPU-bound: keep them off the loop
+            selected = await loop.run_in_executor(None, self._select_local, query, top_n)
+            if selected is None:
+                if subqueries:
+                    outcomes = await asyncio.gather(*[
+                        self._search_async(q, top_n, deep) for q in subqueries
+                    ], return_exceptions=True)
+                    ranked_lists = [r for r in outcomes if not isinstance(r, BaseException)]
+                    if not ranked_lists:
+                        raise outcomes[0]
+                    results = rrf_merge(ranked_lists, k=self.rrf_k)
+                elif deep:
+                    results = await self.async_client.search_songs_deep(
+                        query, top_n, **self._deep_budget(), raise_errors=True
+                    )
+                else:
+                    search_limit = top_n * 2
+                    logger.info(f"Searching with limit={search_limit} (will return {top_n})")
+                    results = await self.async_client.search_songs(query=query, limit=search_limit, raise_errors=True)
+                selected = await loop.run_in_executor(None, self._pick_tracks, query, results, top_n)
+            future.set_result(deepcopy(selected))
+            return selected
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so a leader-only failure does not warn
+            future.exception()
+            raise
+        finally:
+            inflight.pop(key, None)
+
+    async def _search_async(self, query: str, top_n: int, deep: bool = False) -> List[Track]:
+        """One async upstream search sized for top_n"""
+        if deep:
+            return await self.async_client.search_songs_deep(query, top_n, **self._deep_budget(), raise_errors=True)
+        return await self.async_client.search_songs(query=query, limit=top_n * 2, raise_errors=True)
+
+    @property
+    def async_client(self):
+        """Lazily wrap the sync client for the asyncio path"""
+        if self._async_yt is None:
+            from ytm_client import AsyncYTMusicClient
+            self._async_yt = AsyncYTMusicClient(self.yt)
+        return self._async_yt
+
+    @property
+    def ranker(self):
+        """Candidate ranker (default TrackRanker, built lazily)"""
+        if self._ranker is _DEFAULT:
+            from ranking import TrackRanker
+            self._ranker = TrackRanker()
+        return self._ranker
+
+    @ranker.setter
+    def ranker(self, value):
+        self._ranker = value
+
+    @property
+    def near_dedupe(self):
+        """Near-duplicate filter (default NearDuplicateFilter, built lazily)"""
+        if self._near_dedupe is _DEFAULT:
+            from dedupe import NearDuplicateFilter
+            self._near_dedupe = NearDuplicateFilter()
+        return self._near_dedupe
+
+    @near_dedupe.setter
+    def near_dedupe(self, value):
+        self._near_dedupe = value
+
+    def _deep_budget(self) -> dict:
+        return {
+            "page_size": self.deep_page_size,
+            "max_pages": self.deep_max_pages,
+            "time_budget": self.deep_time_budget,
+        }
+
+    def _select_local(self, query: str, top_n: int) -> Optional[List[Track]]:
+        """
+        Answer from the local index when it holds enough fresh, relevant tracks
+        
+        Only a query that itself fetched upstream results within
+        local_max_age is answered locally; a related query (different genre
+        or time of day) would otherwise match the same documents through the
+        query words they were indexed with. Returns None (go upstream) when
+        the index is missing, the query is new or stale, or too few
+        documents match every query term.
+        """
+        if self.local_index is None or not self.use_local_index:
+            return None
+        
+        age = self.local_index.query_age(query)
+        if age is None or age > self.local_max_age:
+            return None
+        
+        with metrics.span("local_index"):
+            hits = self.local_index.search(
+                query,
+                limit=top_n * 2,
+                max_age=self.local_max_age,
+                min_match=self.local_min_match
+            )
+        unique_tracks = self._deduplicate_tracks([track for track, _ in hits])
+        
+        if len(unique_tracks) < top_n:
+            logger.info(f"Local index: {len(unique_tracks)} fresh matches < {top_n}, going upstream")
+            return None
+        
+        logger.info(f"✓ Serving from local index: {len(unique_tracks)} candidates (query='{query}')")
+        return self._pick_tracks(query, unique_tracks, top_n)
+
+    def _select_tracks(
+        self,
+        query: str,
+        top_n: int,
+        deep: bool = False,
+        subqueries: Tuple[str, ...] = (),
+        progress: Optional[ProgressCallback] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> List[Track]:
+        """Search upstream, deduplicate and select EXACTLY top_n tracks"""
+        local_tracks = self._select_local(query, top_n)
+        if local_tracks is not None:
+            return local_tracks
+        
+        if subqueries:
+            return self._pick_tracks(query, self._fan_out_search(subqueries, top_n, deep, progress, cancel), top_n)
+        
+        if deep:
+            logger.info(f"Deep search for {top_n} tracks")
+            results = self.yt.search_songs_deep(
+                query, top_n, **self._deep_budget(),
+                on_page=self._page_progress(progress, top_n, cancel),
+                raise_errors=True
+            )
+            return self._pick_tracks(query, results, top_n)
+        
+        # Search tracks - request MORE than needed for deduplication
+        # CRITICAL FIX: Request 2x tracks for deduplication buffer
+        search_limit = top_n * 2
+        logger.info(f"Searching with limit={search_limit} (will return {top_n})")
+        
+        results = self.yt.search_songs(query=query, limit=search_limit, raise_errors=True)
+        return self._pick_tracks(query, results, top_n)
+
+    def _page_progress(self, progress: Optional[ProgressCallback], top_n: int, cancel: Optional[threading.Event] = None):
+        """Adapt progress/cancel to search_songs_deep's on_page hook"""
+        if progress is None and cancel is None:
+            return None
+        
+        def on_page(tracks: List[Track]):
+            _check_cancel(cancel)
+            _notify(progress, tracks[:top_n], len(tracks), top_n)
+        return on_page
+
+    def _fan_out_search(
+        self,
+        subqueries: Tuple[str, ...],
+        top_n: int,
+        deep: bool = False,
+        progress: Optional[ProgressCallback] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> List[Track]:
+        """Run sub-queries in parallel and fuse their rankings (RRF)"""
+        logger.info(f"Fan-out search: {len(subqueries)} sub-queries {list(subqueries)}")
+        
+        def search(q: str) -> List[Track]:
+            if deep:
+                return self.yt.search_songs_deep(q, top_n, **self._deep_budget(), raise_errors=True)
+            return self.yt.search_songs(query=q, limit=top_n * 2, raise_errors=True)
+        
+        pool = self._fan_out_pool()
+        futures = {pool.submit(search, q): i for i, q in enumerate(subqueries)}
+        ranked_lists: List[List[Track]] = [[] for _ in subqueries]
+        errors: List[Exception] = []
+        finished = 0
+        for future in as_completed(futures):
+            try:
+                ranked_lists[futures[future]] = future.result()
+            except Exception as e:
+                # One failed sub-query only thins the mix
+                logger.warning(f"⚠ Sub-query '{subqueries[futures[future]]}' failed: {e}")
+                errors.append(e)
+            finished += 1
+            _check_cancel(cancel)
+            # Fuse what has arrived so far as a provisional list
+            if progress is not None and finished < len(subqueries):
+                partial = rrf_merge([r for r in ranked_lists if r], k=self.rrf_k)
+                _notify(progress, partial[:top_n], finished, len(subqueries))
+        if len(errors) == len(subqueries):
+            raise errors[0]
+        merged = rrf_merge(ranked_lists, k=self.rrf_k)
+        logger.info(f"RRF merged {sum(len(r) for r in ranked_lists)} hits into {len(merged)} tracks")
+        return merged
+
+    def _fan_out_pool(self) -> ThreadPoolExecutor:
+        """Shared pool for sub-query fan-out (separate from generate_many's)"""
+        with self._inflight_lock:
+            if self._fan_out_executor is None:
+                self._fan_out_executor = ThreadPoolExecutor(
+                    max_workers=self.fan_out_workers,
+                    thread_name_prefix="fan-out"
+                )
+            return self._fan_out_executor
+
+    def _pick_tracks(self, query: str, results: List[Track], top_n: int) -> List[Track]:
+        """Deduplicate raw search results and select EXACTLY top_n tracks"""
+        if not results:
+            logger.warning(f"No results found for query: '{query}'")
+            return []
+        
+        logger.info(f"Found {len(results)} raw results")
+        
+        # Deduplicate by video_id
+        with metrics.span("dedupe"):
+            unique_tracks = self._deduplicate_tracks(results)
+        metrics.inc("tracks_dropped_total", len(results) - len(unique_tracks), reason="duplicate")
+        logger.info(f"After deduplication: {len(unique_tracks)} unique tracks")
+        
+        # Same song from different uploads (lyric video, topic channel, ...)
+        if self.near_dedupe is not None:
+            before = len(unique_tracks)
+            with metrics.span("near_dedupe"):
+                unique_tracks = self.near_dedupe.filter(unique_tracks)
+            metrics.inc("tracks_dropped_total", before - len(unique_tracks), reason="near_duplicate")
+        
+        # CRITICAL FIX: Select EXACTLY top_n tracks
+        with metrics.span("rank"):
+            if self.ranker is not None:
+                selected_tracks = self.ranker.select(unique_tracks, top_n, query)
+            else:
+                selected_tracks = unique_tracks[:top_n]
+        logger.info(f"Selected EXACTLY {len(selected_tracks)} tracks (requested: {top_n})")
+        
+        return selected_tracks
 
     def _build_query(
         self,
@@ -118,6 +723,23 @@ class RecommenderEngine:
         
         return " ".join(parts)
 
+    def _build_subqueries(
+        self,
+        mood: str,
+        activity: str,
+        time_of_day: str,
+        genre: Optional[str] = None
+    ) -> Tuple[str, ...]:
+        """Build fan-out sub-queries: full combination, mood+genre, activity+time"""
+        taste = genre if genre and genre.strip() else activity
+        candidates = [
+            self._build_query(mood, activity, time_of_day, genre),
+            self._build_query(mood, taste, "", None),
+            self._build_query(activity, time_of_day, "", None),
+        ]
+        # Keep order, drop duplicates (e.g. no genre given)
+        return tuple(dict.fromkeys(candidates))
+
     def _deduplicate_tracks(self, tracks: List[Track]) -> List[Track]:
         """Remove duplicate tracks by video_id"""
         seen_ids = set()
@@ -156,6 +778,21 @@ class RecommenderEngine:
         base_name = " ".join(parts) if parts else "My Playlist"
         return f"{base_name} Mix"
 
+    def attach_client(self, ytm_client):
+        """Attach a client connected after construction (leaves fallback mode)"""
+        self.yt = ytm_client
+        self._async_yt = None
+        if self.local_index is None:
+            self.local_index = getattr(ytm_client, "index", None)
+        self._fallback_mode = ytm_client is None
+        if not self._fallback_mode:
+            logger.info("✓ Recommender attached to YouTube Music client")
+
+    def warm_up(self):
+        """Build lazily-created components now (e.g. from a background thread)"""
+        self.ranker
+        self.near_dedupe
+
     def is_ready(self) -> bool:
         """Check if recommender is ready"""
         return not self._fallback_mode and self.yt is not None
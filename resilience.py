@@ -0,0 +1,393 @@
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying (throttling, timeouts, server-side errors)
+TRANSIENT_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+THROTTLE_STATUSES = frozenset({429, 503})
+
+_STATUS_IN_MESSAGE = re.compile(r"\b(?:HTTP|status(?: code)?)[^\d]{0,3}(\d{3})\b", re.IGNORECASE)
+
+# Circuit states as exported in the circuit_state gauge
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class UpstreamUnavailable(Exception):
+    """Upstream is throttled, known to be down, or kept failing
+
+    retry_after is the suggested wait in seconds before trying again
+    (None = unknown).
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(UpstreamUnavailable):
+    """Raised without calling upstream while the circuit breaker is open"""
+
+
+class RateLimited(UpstreamUnavailable):
+    """Raised when no rate-limit token became available in time"""
+
+
+class UpstreamFailed(UpstreamUnavailable):
+    """Transient upstream failure that retries did not fix (cause in __cause__)"""
+
+
+def status_of(error: BaseException) -> Optional[int]:
+    """HTTP status carried by an exception (requests-style or in the message)"""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status
+    match = _STATUS_IN_MESSAGE.search(str(error))
+    return int(match.group(1)) if match else None
+
+
+def is_transient(error: BaseException) -> bool:
+    """True for failures a retry may fix: throttling, timeouts, 5xx, dropped connections"""
+    status = status_of(error)
+    if status is not None:
+        return status in TRANSIENT_STATUSES
+    # requests' ConnectionError/Timeout derive from OSError too
+    return isinstance(error, (ConnectionError, TimeoutError, OSError))
+
+
+def retry_after_of(error: BaseException) -> Optional[float]:
+    """Retry-After seconds sent with a throttling response, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose refill rate adapts to throttling
+
+    Every upstream call takes one token. throttle() halves the rate (down
+    to min_rate) when upstream pushes back; each success() adds a small
+    step back towards max_rate, so the client settles just under the
+    rate upstream tolerates (AIMD).
+    """
+
+    def __init__(
+        self,
+        rate: float = 5.0,
+        burst: int = 10,
+        min_rate: float = 0.5,
+        recovery_step: float = 0.1
+    ):
+        """
+        Initialize bucket
+
+        Args:
+            rate: Tokens per second at full speed (also the ceiling;
+                math.inf = no rate limit)
+            burst: Bucket capacity (calls allowed back-to-back)
+            min_rate: Floor for the adaptive rate
+            recovery_step: Tokens/second regained per successful call
+        """
+        self.max_rate = max(min_rate, rate)
+        self.min_rate = min_rate
+        self.rate = self.max_rate
+        self.burst = max(1, burst)
+        self.recovery_step = recovery_step
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._export()
+
+    def _refill(self, now: float):
+        """Add tokens for the time since the last update (caller holds lock)"""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Take one token, sleeping until one is available
+
+        Returns:
+            False if none became available within `timeout` seconds
+        """
+        if self.max_rate == math.inf:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                delay = (1 - self._tokens) / self.rate
+            if deadline is not None and now + delay > deadline:
+                return False
+            time.sleep(delay)
+            waited += delay
+
+        if waited:
+            metrics.observe("stage_seconds", waited, stage="ratelimit_wait")
+        return True
+
+    def throttle(self):
+        """Upstream pushed back: halve the rate and drop saved-up burst"""
+        with self._lock:
+            old = self.rate
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+        metrics.inc("ratelimit_throttled_total")
+        self._export()
+        if self.rate < old:
+            logger.warning(f"⚠ Upstream throttling: rate {old:.2f} -> {self.rate:.2f} req/s")
+
+    def success(self):
+        """Creep back towards max_rate after a successful call"""
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.recovery_step)
+        self._export()
+
+    def _export(self):
+        if self.max_rate != math.inf:
+            metrics.METRICS.set_gauge("ratelimit_rate", self.rate)
+
+    def __repr__(self) -> str:
+        return f"TokenBucket(rate={self.rate:.2f}/{self.max_rate:.2f}, burst={self.burst})"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker
+
+    After `failure_threshold` failed upstream attempts in a row the
+    circuit opens and calls fail fast for `reset_timeout` seconds. Then a single trial call
+    is let through (half-open): success closes the circuit, failure opens
+    it again for another timeout.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, name: str = "upstream"):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.name = name
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self._export()
+
+    def allow(self) -> bool:
+        """True if a call may go upstream now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def abandon(self):
+        """Give back a call allowed by allow() that was never made"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def retry_in(self) -> float:
+        """Seconds until the next trial call is allowed (0 when closed)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def _transition(self, state: str):
+        """Change state (caller holds lock)"""
+        previous, self.state = self.state, state
+        metrics.inc("circuit_transitions_total", breaker=self.name, state=state)
+        self._export()
+        if state == OPEN:
+            logger.warning(
+                f"⚠ Circuit '{self.name}' open after {self.failures} failures; "
+                f"failing fast for {self.reset_timeout:g}s"
+            )
+        else:
+            logger.info(f"Circuit '{self.name}': {previous} -> {state}")
+
+    def _export(self):
+        metrics.METRICS.set_gauge("circuit_state", _STATE_VALUES[self.state], breaker=self.name)
+
+    def __repr__(self) -> str:
+        return f"CircuitBreaker(name={self.name!r}, state={self.state}, failures={self.failures})"
+
+
+class UpstreamGuard:
+    """Rate limiter + retry with jittered backoff + circuit breaker around upstream calls
+
+    call() waits for a rate-limit token, refuses immediately while the
+    breaker is open, and retries transient failures with full-jitter
+    exponential backoff (honouring Retry-After). Non-transient errors are
+    raised at once and do not count against upstream health.
+    """
+
+    def __init__(
+        self,
+        limiter: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        attempts: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0,
+        token_timeout: float = 5.0,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Initialize guard
+
+        Args:
+            limiter: Shared token bucket (default: TokenBucket())
+            breaker: Shared circuit breaker (default: CircuitBreaker())
+            attempts: Tries per call, including the first
+            backoff_base: First retry delay ceiling in seconds (doubles per retry)
+            backoff_cap: Maximum delay ceiling between retries
+            token_timeout: Seconds to wait for a rate-limit token before RateLimited
+            sleep: Sleep function (swappable for tests)
+        """
+        self.limiter = limiter if limiter is not None else TokenBucket()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.attempts = max(1, attempts)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.token_timeout = token_timeout
+        self._sleep = sleep
+        self._rng = random.Random()
+
+    @classmethod
+    def from_env(cls) -> "UpstreamGuard":
+        """
+        Guard configured from environment variables
+
+        SMARTPLAYLIST_RATE_LIMIT   upstream calls per second (default 5)
+        SMARTPLAYLIST_RATE_BURST   back-to-back calls allowed (default 10)
+        SMARTPLAYLIST_RETRIES      tries per call including the first (default 3)
+        """
+        def number(name: str, default: float) -> float:
+            try:
+                return float(os.environ.get(name, "") or default)
+            except ValueError:
+                logger.warning(f"⚠ Ignoring invalid {name}={os.environ[name]!r}")
+                return default
+
+        limiter = TokenBucket(
+            rate=number("SMARTPLAYLIST_RATE_LIMIT", 5.0),
+            burst=int(number("SMARTPLAYLIST_RATE_BURST", 10))
+        )
+        return cls(limiter=limiter, attempts=int(number("SMARTPLAYLIST_RETRIES", 3)))
+
+    @classmethod
+    def unlimited(cls, **kwargs) -> "UpstreamGuard":
+        """Guard without rate limiting (replayed fixtures, benchmarks); retries and breaker stay"""
+        return cls(limiter=TokenBucket(rate=math.inf), **kwargs)
+
+    def backoff(self, retry: int, error: Optional[BaseException] = None) -> float:
+        """Delay before retry number `retry` (1-based): full jitter, or Retry-After"""
+        ceiling = min(self.backoff_cap, self.backoff_base * (2 ** (retry - 1)))
+        delay = self._rng.uniform(0, ceiling)
+        retry_after = retry_after_of(error) if error is not None else None
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_cap))
+        return delay
+
+    def call(self, op: str, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Run func(*args, **kwargs) under rate limiting, retries and the breaker
+
+        Raises:
+            CircuitOpen: Breaker open, upstream not called
+            RateLimited: No token within token_timeout
+            UpstreamFailed: Transient errors outlasted the retries (or
+                opened the breaker); wraps the last one
+            Exception: Any non-transient error, immediately and unchanged
+        """
+        for attempt in range(1, self.attempts + 1):
+            if not self.breaker.allow():
+                metrics.inc("circuit_rejected_total", op=op)
+                retry_in = self.breaker.retry_in()
+                raise CircuitOpen(f"{op}: upstream circuit open, retry in {retry_in:.0f}s", retry_after=retry_in)
+            if not self.limiter.acquire(timeout=self.token_timeout):
+                self.breaker.abandon()
+                metrics.inc("ratelimit_rejected_total", op=op)
+                raise RateLimited(
+                    f"{op}: no rate-limit token within {self.token_timeout:.1f}s",
+                    retry_after=1.0 / self.limiter.rate
+                )
+
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_transient(e):
+                    # The request itself was wrong: says nothing about
+                    # upstream health, so leave the breaker state alone
+                    self.breaker.abandon()
+                    raise
+                self.breaker.record_failure()
+                if status_of(e) in THROTTLE_STATUSES:
+                    self.limiter.throttle()
+                if attempt >= self.attempts or self.breaker.state == OPEN:
+                    retry_after = retry_after_of(e)
+                    if retry_after is None and self.breaker.state == OPEN:
+                        retry_after = self.breaker.retry_in()
+                    raise UpstreamFailed(f"{op} failed on attempt {attempt}: {e}", retry_after=retry_after) from e
+                delay = self.backoff(attempt, e)
+                metrics.inc("upstream_retries_total", op=op)
+                logger.warning(f"⚠ {op} failed ({e}); retry {attempt}/{self.attempts - 1} in {delay:.2f}s")
+                self._sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self.limiter.success()
+            return result
+
+    def stats(self) -> dict:
+        return {
+            # None = not rate limited (keeps the stats valid JSON)
+            "rate": round(self.limiter.rate, 3) if self.limiter.max_rate != math.inf else None,
+            "max_rate": self.limiter.max_rate if self.limiter.max_rate != math.inf else None,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "retry_in": round(self.breaker.retry_in(), 1),
+        }
+
+    def __repr__(self) -> str:
+        return f"UpstreamGuard({self.limiter!r}, {self.breaker!r}, attempts={self.attempts})"
@@ -0,0 +1,141 @@
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from recommender import GenerationCancelled
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationJob:
+    """One generate request: immutable parameters plus a cancel flag"""
+
+    __slots__ = ("id", "params", "cancel", "submitted_at", "finished")
+
+    def __init__(self, job_id: int, params: Dict[str, Any]):
+        self.id = job_id
+        self.params = params
+        self.cancel = threading.Event()
+        self.submitted_at = time.monotonic()
+        self.finished = False
+
+    def __repr__(self) -> str:
+        return f"GenerationJob(id={self.id}, cancelled={self.cancel.is_set()}, finished={self.finished})"
+
+
+class GenerationScheduler:
+    """Latest-wins job runner on a small persistent worker pool
+
+    Every submit() gets a new generation id and cancels the job it
+    replaces: a superseded job that has not started is skipped without
+    touching the network, and a running one stops at its next cancel
+    check. Results of superseded jobs are dropped, so only the latest
+    request ever reaches on_done. Re-submitting the parameters of the
+    job already in flight returns that job instead of starting another.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[GenerationJob], Any],
+        on_done: Callable[[GenerationJob, Any, Optional[BaseException]], None],
+        workers: int = 2
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            run: Worker-thread function producing a job's result; should
+                honour job.cancel (e.g. pass it to RecommenderEngine.generate)
+            on_done: Called from the worker thread with (job, result, error)
+                for the latest job only
+            workers: Persistent worker threads (>= 2 lets a new job start
+                while a cancelled one winds down)
+        """
+        self._run = run
+        self._on_done = on_done
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="generate-job")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._latest: Optional[GenerationJob] = None
+
+        self.submitted = 0
+        self.superseded = 0
+        self.skipped = 0
+        self.completed = 0
+
+    def submit(self, params: Dict[str, Any]) -> GenerationJob:
+        """Queue a job with a snapshot of `params`, superseding older ones"""
+        with self._lock:
+            latest = self._latest
+            if latest is not None and not latest.finished:
+                if latest.params == params and not latest.cancel.is_set():
+                    logger.info(f"Generation {latest.id} already running with the same parameters")
+                    return latest
+                latest.cancel.set()
+                self.superseded += 1
+
+            job = GenerationJob(next(self._ids), dict(params))
+            self._latest = job
+            self.submitted += 1
+
+        self._executor.submit(self._execute, job)
+        return job
+
+    def is_current(self, job_id: int) -> bool:
+        """True if `job_id` is the latest submitted job"""
+        latest = self._latest
+        return latest is not None and latest.id == job_id
+
+    def cancel(self):
+        """Cancel the latest job (its result will be dropped)"""
+        with self._lock:
+            if self._latest is not None:
+                self._latest.cancel.set()
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "superseded": self.superseded,
+            "skipped": self.skipped,
+            "completed": self.completed,
+        }
+
+    def _execute(self, job: GenerationJob):
+        if job.cancel.is_set():
+            # Superseded while queued: no upstream call at all
+            job.finished = True
+            with self._lock:
+                self.skipped += 1
+            return
+
+        result, error = None, None
+        try:
+            result = self._run(job)
+        except GenerationCancelled:
+            logger.info(f"Generation {job.id} cancelled")
+        except Exception as e:
+            error = e
+        finally:
+            job.finished = True
+
+        if job.cancel.is_set() or not self.is_current(job.id):
+            logger.info(f"Discarding stale result of generation {job.id}")
+            return
+
+        with self._lock:
+            self.completed += 1
+        try:
+            self._on_done(job, result, error)
+        except Exception as e:
+            logger.error(f"✗ Generation result handler failed: {e}")
+
+    def __repr__(self) -> str:
+        latest = self._latest.id if self._latest is not None else None
+        return f"GenerationScheduler(latest={latest}, superseded={self.superseded}, skipped={self.skipped})"
@@ -0,0 +1,429 @@
+"""
+Local HTTP/JSON service around one shared RecommenderEngine.
+
+Usage:
+    python main.py serve --host 127.0.0.1 --port 8765 --max-concurrent 8
+
+Routes:
+    GET|POST /generate        spec as query string or JSON body -> playlist JSON
+    GET      /track/<id>      track details
+    GET|POST /export?format=  spec -> playlist file (json, ndjson, csv, m3u8, txt)
+    GET      /health          liveness, capacity and cache stats
+    GET      /metrics         Prometheus text (see metrics.py)
+
+Specs use the batch CLI fields (mood, activity, time, genre, count, ...).
+Responses carry an ETag; repeating a spec with If-None-Match gets a 304
+from the response cache without touching the engine. Past the concurrency
+cap requests get 429 with Retry-After instead of queueing unboundedly.
+Never imports tkinter.
+"""
+import argparse
+import hashlib
+import io
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+from cli import SpecError, normalize_spec, spec_key
+from exporters import WRITERS
+from resilience import CLOSED, UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY = 1 << 20
+
+_VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+CONTENT_TYPES = {
+    "json": "application/json; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "m3u8": "application/vnd.apple.mpegurl; charset=utf-8",
+    "txt": "text/plain; charset=utf-8",
+}
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+ROUTES = ("/generate", "/export", "/health", "/metrics")
+
+
+class HttpError(Exception):
+    """Error with an HTTP status, rendered as a JSON body"""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Response:
+    """Immutable rendered response (cached bodies are shared between requests)"""
+
+    __slots__ = ("status", "body", "content_type", "etag", "created")
+
+    def __init__(self, status: int, body: bytes, content_type: str, etag: Optional[str] = None):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.created = time.monotonic()
+
+
+def _json_response(payload, status: int = 200, etag: bool = False) -> Response:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    tag = f'"{hashlib.sha1(body).hexdigest()[:20]}"' if etag else None
+    return Response(status, body, CONTENT_TYPES["json"], tag)
+
+
+class PlaylistService:
+    """Route logic shared by every request thread
+
+    Holds the engine, a TTL+LRU cache of rendered responses (keyed by the
+    normalized spec, so repeats and their ETags are cheap) and the
+    admission semaphore used for back-pressure.
+    """
+
+    def __init__(
+        self,
+        engine,
+        max_concurrent: int = 8,
+        queue_timeout: float = 0.25,
+        retry_after: int = 1,
+        response_ttl: float = 300,
+        max_responses: int = 1024
+    ):
+        """
+        Initialize service
+
+        Args:
+            engine: RecommenderEngine shared by all requests
+            max_concurrent: Requests allowed into the engine at once
+            queue_timeout: Seconds a request may wait for a slot before 429
+            retry_after: Retry-After seconds sent with 429
+            response_ttl: Seconds a rendered playlist is reused for a repeated spec
+            max_responses: Rendered responses kept (LRU)
+        """
+        self.engine = engine
+        self.max_concurrent = max(1, max_concurrent)
+        self.queue_timeout = max(0.0, queue_timeout)
+        self.retry_after = max(1, int(retry_after))
+        self.response_ttl = response_ttl
+        self.max_responses = max(1, max_responses)
+        self.started_at = time.time()
+
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._inflight = 0
+        self._responses: "OrderedDict[str, Response]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Admission / response cache
+    # ------------------------------------------------------------------
+    def admit(self):
+        """Take an engine slot or raise 429"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            metrics.inc("http_rejected_total")
+            raise HttpError(429, "server busy, retry later", {"Retry-After": str(self.retry_after)})
+        with self._lock:
+            self._inflight += 1
+            metrics.METRICS.set_gauge("http_inflight", self._inflight)
+
+    def release(self):
+        with self._lock:
+            self._inflight -= 1
+            metrics.METRICS.set_gauge("http_inflight", self._inflight)
+        self._slots.release()
+
+    def cached(self, key: str) -> Optional[Response]:
+        with self._lock:
+            response = self._responses.get(key)
+            if response is None:
+                return None
+            if time.monotonic() - response.created > self.response_ttl:
+                del self._responses[key]
+                return None
+            self._responses.move_to_end(key)
+            return response
+
+    def _remember(self, key: str, response: Response):
+        with self._lock:
+            self._responses[key] = response
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.max_responses:
+                self._responses.popitem(last=False)
+
+    def _through_cache(self, key: str, build) -> Response:
+        """Cached response for `key`, or build() it inside an engine slot"""
+        response = self.cached(key)
+        if response is not None:
+            return response
+        self.admit()
+        try:
+            response = build()
+        finally:
+            self.release()
+        if response.status == 200:
+            self._remember(key, response)
+        return response
+
+    # ------------------------------------------------------------------
+    # Routes
+    # ------------------------------------------------------------------
+    def _generate(self, params: Dict):
+        if getattr(self.engine, "_fallback_mode", False) or not getattr(self.engine, "yt", None):
+            raise HttpError(503, "YouTube Music client unavailable")
+        try:
+            playlist, query = self.engine.generate(**params, raise_errors=True)
+        except UpstreamUnavailable as e:
+            raise _unavailable(e)
+        except Exception as e:
+            raise HttpError(502, f"playlist generation failed: {e}")
+        if playlist is None:
+            raise HttpError(404, f"no tracks found for query '{query}'")
+        return playlist, query
+
+    def generate(self, params: Dict) -> Response:
+        key = f"generate:{spec_key(params)}"
+
+        def build() -> Response:
+            playlist, query = self._generate(params)
+            return _json_response({
+                "name": playlist.name,
+                "query": query,
+                "spec": params,
+                "count": len(playlist.tracks),
+                "tracks": [track.to_dict() for track in playlist.tracks],
+            }, etag=True)
+
+        return self._through_cache(key, build)
+
+    def export(self, params: Dict, fmt: str) -> Response:
+        writer_cls = WRITERS.get(fmt)
+        if writer_cls is None:
+            raise HttpError(400, f"unsupported format {fmt!r} (choose from {', '.join(sorted(WRITERS))})")
+        key = f"export:{fmt}:{spec_key(params)}"
+
+        def build() -> Response:
+            playlist, _ = self._generate(params)
+            buffer = io.StringIO(newline=writer_cls.newline)
+            writer_cls(buffer, name=playlist.name).write_all(playlist.tracks)
+            body = buffer.getvalue().encode("utf-8")
+            content_type = CONTENT_TYPES.get(writer_cls.extension.lstrip("."), CONTENT_TYPES["txt"])
+            return Response(200, body, content_type,
+                            f'"{hashlib.sha1(body).hexdigest()[:20]}"')
+
+        return self._through_cache(key, build)
+
+    def track(self, video_id: str) -> Response:
+        if not _VIDEO_ID.match(video_id):
+            raise HttpError(400, "invalid video id")
+        if not getattr(self.engine, "yt", None):
+            raise HttpError(503, "YouTube Music client unavailable")
+
+        def build() -> Response:
+            try:
+                track = self.engine.yt.get_track_info(video_id)
+            except UpstreamUnavailable as e:
+                raise _unavailable(e)
+            if track is None:
+                raise HttpError(404, f"track {video_id} not found")
+            return _json_response(track.to_dict(), etag=True)
+
+        return self._through_cache(f"track:{video_id}", build)
+
+    def health(self) -> Response:
+        with self._lock:
+            inflight = self._inflight
+            cached = len(self._responses)
+        yt = getattr(self.engine, "yt", None)
+        cache = getattr(yt, "cache", None)
+        guard = getattr(yt, "guard", None)
+        return _json_response({
+            "status": "ok" if yt is not None and (guard is None or guard.breaker.state == CLOSED) else "degraded",
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "inflight": inflight,
+            "max_concurrent": self.max_concurrent,
+            "cached_responses": cached,
+            "coalesced_calls": getattr(self.engine, "coalesced_calls", 0),
+            "search_cache": {"hits": cache.hits, "misses": cache.misses} if cache is not None else None,
+            "upstream": guard.stats() if guard is not None else None,
+        })
+
+
+# ----------------------------------------------------------------------
+# HTTP plumbing
+# ----------------------------------------------------------------------
+def _unavailable(error: UpstreamUnavailable) -> HttpError:
+    """503 for a throttled/down upstream, with Retry-After when known"""
+    headers = {}
+    if error.retry_after is not None:
+        headers["Retry-After"] = str(max(1, math.ceil(error.retry_after)))
+    return HttpError(503, f"upstream unavailable: {error}", headers)
+
+
+def _etag_matches(header: Optional[str], etag: Optional[str]) -> bool:
+    if not header or not etag:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class PlaylistRequestHandler(BaseHTTPRequestHandler):
+    """Thin adapter from HTTP requests to PlaylistService"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "SmartPlaylist/1.0"
+
+    @property
+    def service(self) -> PlaylistService:
+        return self.server.service
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        route = url.path.rstrip("/") or "/"
+        label = route if route in ROUTES else ("/track" if route.startswith("/track/") else "other")
+        status = 500
+        try:
+            with metrics.span("http", route=label):
+                # Always consume the body so a keep-alive connection stays in sync
+                self._body = self._read_body()
+                response = self._route(route, url.query)
+                status = response.status
+                if response.etag and _etag_matches(self.headers.get("If-None-Match"), response.etag):
+                    status = 304
+                    self._send(304, b"", None, {"ETag": response.etag})
+                else:
+                    headers = {"ETag": response.etag} if response.etag else {}
+                    self._send(response.status, response.body, response.content_type, headers)
+        except HttpError as e:
+            status = e.status
+            self._send_error(e.status, str(e), e.headers)
+        except Exception as e:
+            logger.error(f"✗ {self.command} {self.path} failed: {e}", exc_info=True)
+            self._send_error(500, "internal error")
+        finally:
+            metrics.inc("http_requests_total", route=label, code=status)
+
+    def _route(self, route: str, query: str) -> Response:
+        if route == "/health":
+            return self.service.health()
+        if route == "/metrics":
+            body = metrics.METRICS.to_prometheus().encode("utf-8")
+            return Response(200, body, PROMETHEUS_TYPE)
+        if route == "/generate":
+            return self.service.generate(self._spec(query))
+        if route == "/export":
+            fmt = (parse_qs(query).get("format") or ["json"])[0].lower()
+            return self.service.export(self._spec(query), fmt)
+        if route.startswith("/track/") and self.command == "GET":
+            return self.service.track(route[len("/track/"):])
+        raise HttpError(404, f"no route for {self.command} {route}")
+
+    def _read_body(self) -> bytes:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY:
+            self.close_connection = True
+            raise HttpError(413, "request body too large or malformed Content-Length")
+        return self.rfile.read(length) if length else b""
+
+    def _spec(self, query: str) -> Dict:
+        """generate() kwargs from the JSON body (POST) or query string (GET)"""
+        if self.command == "POST":
+            try:
+                raw = json.loads(self._body or b"{}")
+            except ValueError:
+                raise HttpError(400, "body must be a JSON object")
+            if not isinstance(raw, dict):
+                raise HttpError(400, "body must be a JSON object")
+        else:
+            raw = {k: v[0] for k, v in parse_qs(query).items() if k != "format"}
+        try:
+            _, params = normalize_spec(raw)
+        except SpecError as e:
+            raise HttpError(400, str(e))
+        return params
+
+    def _send(self, status: int, body: bytes, content_type: Optional[str], headers: Dict[str, str]):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps({"error": message}).encode("utf-8")
+        self._send(status, body, CONTENT_TYPES["json"], headers or {})
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class PlaylistServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer carrying the shared PlaylistService"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address: Tuple[str, int], service: PlaylistService):
+        super().__init__(address, PlaylistRequestHandler)
+        self.service = service
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="main.py serve", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"bind address (default {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port (default {DEFAULT_PORT})")
+    parser.add_argument("--max-concurrent", type=int, default=8, help="requests inside the engine at once")
+    parser.add_argument("--queue-timeout", type=float, default=0.25, help="seconds to wait for a slot before 429")
+    parser.add_argument("--response-ttl", type=float, default=300, help="seconds a generated playlist is reused")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every pipeline step")
+    args = parser.parse_args(argv)
+
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logger.setLevel(logging.INFO)
+
+    from cli import build_engine, close_engine
+
+    service = PlaylistService(
+        build_engine(),
+        max_concurrent=args.max_concurrent,
+        queue_timeout=args.queue_timeout,
+        response_ttl=args.response_ttl
+    )
+    httpd = PlaylistServer((args.host, args.port), service)
+    logger.info(f"✓ Serving on http://{args.host}:{httpd.server_address[1]}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        httpd.server_close()
+        close_engine(service.engine)
+    return 0
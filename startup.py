@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Taken when main.py imports this module, before any heavy import
+PROCESS_START = time.perf_counter()
+
+STARTUP_LOG = "data/benchmarks/startup.ndjson"
+DEFAULT_TARGET = 1.5
+
+
+class StartupTimer:
+    """Startup phase timings and a time-to-first-frame report
+
+    Phases (import, gui_build, client_init, ...) record their duration;
+    marks (first_frame) record seconds since process start. The report is
+    logged once every expected entry is in (client init runs in the
+    background and may finish after the first frame), compared against
+    the target and appended to data/benchmarks/startup.ndjson.
+    """
+
+    def __init__(
+        self,
+        target: Optional[float] = None,
+        expected: Iterable[str] = ("import", "gui_build", "first_frame", "client_init"),
+        log_path: Optional[str] = STARTUP_LOG,
+        origin: float = PROCESS_START
+    ):
+        """
+        Initialize timer
+
+        Args:
+            target: Time-to-first-frame target in seconds
+                (default: SMARTPLAYLIST_STARTUP_TARGET or 1.5)
+            expected: Phases/marks that must be recorded before reporting
+            log_path: NDJSON file the report is appended to (None = log only)
+            origin: perf_counter() value treated as process start
+        """
+        if target is None:
+            target = float(os.environ.get("SMARTPLAYLIST_STARTUP_TARGET", DEFAULT_TARGET))
+        self.target = target
+        self.expected = set(expected)
+        self.log_path = log_path
+        self.origin = origin
+
+        self.phases: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+        self._reported = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as phase `name` (recorded even on error)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.phases[name] = seconds
+            self.marks[f"{name}_done"] = time.perf_counter() - self.origin
+        logger.info(f"⏱ Startup {name}: {seconds * 1000:.0f} ms")
+        self._maybe_report()
+
+    def mark(self, name: str):
+        """Record seconds since process start for `name`"""
+        with self._lock:
+            self.marks[name] = time.perf_counter() - self.origin
+        logger.info(f"⏱ Startup {name} at {self.marks[name] * 1000:.0f} ms")
+        self._maybe_report()
+
+    def report(self) -> dict:
+        with self._lock:
+            first_frame = self.marks.get("first_frame")
+            return {
+                "timestamp": time.time(),
+                "phases_ms": {k: round(v * 1000, 1) for k, v in self.phases.items()},
+                "marks_ms": {k: round(v * 1000, 1) for k, v in self.marks.items()},
+                "time_to_first_frame_ms": None if first_frame is None else round(first_frame * 1000, 1),
+                "target_ms": round(self.target * 1000, 1),
+                "within_target": None if first_frame is None else first_frame <= self.target,
+            }
+
+    def _maybe_report(self):
+        with self._lock:
+            done = set(self.phases) | set(self.marks)
+            if self._reported or not self.expected <= done:
+                return
+            self._reported = True
+
+        report = self.report()
+        ttff = report["time_to_first_frame_ms"]
+        if ttff is not None and not report["within_target"]:
+            logger.warning(f"⚠ Time to first frame {ttff:.0f} ms exceeds target {report['target_ms']:.0f} ms")
+        elif ttff is not None:
+            logger.info(f"✓ Time to first frame {ttff:.0f} ms (target {report['target_ms']:.0f} ms)")
+
+        if self.log_path:
+            try:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(report) + "\n")
+            except OSError as e:
+                logger.warning(f"⚠ Failed to write startup report: {e}")
+
+    def __repr__(self) -> str:
+        return f"StartupTimer(phases={list(self.phases)}, marks={list(self.marks)})"
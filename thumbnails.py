@@ -0,0 +1,294 @@
+import hashlib
+import heapq
+import io
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+THUMB_DIR = "data/cache/thumbs"
+THUMB_SIZE = (32, 32)
+
+Fetcher = Callable[[str], bytes]
+
+
+class HttpFetcher:
+    """Default fetcher: one pooled keep-alive session shared by all workers"""
+
+    def __init__(self, timeout: float = 10.0):
+        import requests
+
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = "SmartPlaylistGenerator/1.0"
+
+    def __call__(self, url: str) -> bytes:
+        response = self._session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
+
+
+class ThumbnailLoader:
+    """Prioritized background thumbnail fetching with disk + PhotoImage caches
+
+    Requests go into a priority heap served by a fixed pool of daemon
+    workers. A worker resolves a URL from the disk cache or the fetcher,
+    decodes and resizes it with Pillow, and hands the image back; only
+    drain() and photo(), which must be called on the Tk thread, touch
+    Tk objects. Images pinned by the view are never evicted, and failed
+    URLs may be retried after `failure_ttl` seconds. The fetcher is any callable url -> bytes, so tests can
+    swap in a local stand-in.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = THUMB_DIR,
+        size: Tuple[int, int] = THUMB_SIZE,
+        workers: int = 4,
+        max_photos: int = 512,
+        fetcher: Optional[Fetcher] = None,
+        on_ready: Optional[Callable[[], None]] = None,
+        failure_ttl: float = 300.0
+    ):
+        """
+        Initialize loader
+
+        Args:
+            cache_dir: Directory for resized PNGs (None = no disk cache)
+            size: Thumbnail bounding box in pixels
+            workers: Max concurrent fetches
+            max_photos: Unpinned PhotoImage objects kept in memory (LRU)
+            fetcher: Callable url -> image bytes (default: HttpFetcher)
+            on_ready: Called from a worker thread when images wait in drain()
+            failure_ttl: Seconds before a failed URL may be requested again
+        """
+        self.cache_dir = cache_dir
+        self.size = size
+        self.workers = max(1, workers)
+        self.max_photos = max(1, max_photos)
+        self.fetcher = fetcher
+        self.on_ready = on_ready
+        self.failure_ttl = failure_ttl
+
+        self.fetched = 0
+        self.disk_hits = 0
+        self.failures = 0
+
+        self._heap: List[Tuple[tuple, int, str]] = []
+        self._best: Dict[str, tuple] = {}
+        self._inflight: Set[str] = set()
+        # url -> monotonic time after which it may be retried
+        self._failed: Dict[str, float] = {}
+        self._ready: Deque[Tuple[str, "Image.Image"]] = deque()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+        # Tk thread only
+        self._photos: "OrderedDict[str, object]" = OrderedDict()
+        # url -> number of rendered rows showing it
+        self._pinned: Dict[str, int] = {}
+
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"⚠ Thumbnail cache dir unavailable, memory only: {e}")
+                self.cache_dir = None
+
+    # ------------------------------------------------------------------
+    # Tk thread API
+    # ------------------------------------------------------------------
+    def request(self, url: str, priority: tuple = (0,)):
+        """Queue `url`; lower priority values are fetched first"""
+        if not url or url in self._photos:
+            return
+        with self._cond:
+            if url in self._inflight:
+                return
+            retry_at = self._failed.get(url)
+            if retry_at is not None:
+                if time.monotonic() < retry_at:
+                    return
+                del self._failed[url]
+            best = self._best.get(url)
+            if best is not None and best <= priority:
+                return
+            self._best[url] = priority
+            heapq.heappush(self._heap, (priority, next(self._seq), url))
+            self._ensure_workers()
+            self._cond.notify()
+
+    def reset(self):
+        """Drop queued (not yet started) requests, e.g. when the playlist changes"""
+        with self._cond:
+            self._heap.clear()
+            self._best.clear()
+
+    def pin(self, url: Optional[str]):
+        """A rendered row shows `url`; its PhotoImage is not evicted while pinned"""
+        if url:
+            self._pinned[url] = self._pinned.get(url, 0) + 1
+
+    def unpin(self, url: Optional[str]):
+        """Undo one pin() (the row was removed or shows another image)"""
+        count = self._pinned.get(url, 0)
+        if count > 1:
+            self._pinned[url] = count - 1
+        elif count:
+            del self._pinned[url]
+
+    def photo(self, url: Optional[str]):
+        """Cached PhotoImage for `url` or None"""
+        if not url:
+            return None
+        photo = self._photos.get(url)
+        if photo is not None:
+            self._photos.move_to_end(url)
+        return photo
+
+    def drain(self) -> List[str]:
+        """Turn decoded images into PhotoImages; returns their URLs"""
+        from PIL import ImageTk
+
+        urls = []
+        while True:
+            try:
+                url, image = self._ready.popleft()
+            except IndexError:
+                break
+            self._photos[url] = ImageTk.PhotoImage(image)
+            self._photos.move_to_end(url)
+            urls.append(url)
+
+        # Tk drops an image once its last Python reference goes, even if a
+        # row still shows it, so only evict images no rendered row uses
+        excess = len(self._photos) - self.max_photos
+        if excess > 0:
+            for url in list(self._photos):
+                if excess <= 0:
+                    break
+                if url not in self._pinned:
+                    del self._photos[url]
+                    excess -= 1
+        return urls
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = len(self._best)
+        return {
+            "queued": queued,
+            "fetched": self.fetched,
+            "disk_hits": self.disk_hits,
+            "failures": self.failures,
+            "photos": len(self._photos),
+            "pinned": len(self._pinned),
+        }
+
+    def close(self):
+        """Stop workers after their current fetch"""
+        with self._cond:
+            self._closed = True
+            self._heap.clear()
+            self._best.clear()
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+    def _ensure_workers(self):
+        """Start the pool on first use (caller holds lock)"""
+        if self._threads or self._closed:
+            return
+        if self.fetcher is None:
+            self.fetcher = HttpFetcher()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"thumb-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next(self) -> Optional[str]:
+        """Pop the best-priority live request (blocks; None on close)"""
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                while self._heap:
+                    priority, _, url = heapq.heappop(self._heap)
+                    # Skip entries superseded by a better priority or a reset
+                    if self._best.get(url) == priority:
+                        del self._best[url]
+                        self._inflight.add(url)
+                        return url
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            url = self._next()
+            if url is None:
+                return
+            try:
+                image = self._load(url)
+            except Exception as e:
+                logger.debug(f"Thumbnail failed {url}: {e}")
+                image = None
+
+            with self._cond:
+                self._inflight.discard(url)
+                if image is None:
+                    self.failures += 1
+                    self._failed[url] = time.monotonic() + self.failure_ttl
+                    continue
+                was_empty = not self._ready
+                self._ready.append((url, image))
+
+            if was_empty and self.on_ready is not None:
+                self.on_ready()
+
+    def _path_for(self, url: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha1(f"{url}|{self.size[0]}x{self.size[1]}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"thumb_{digest}.png")
+
+    def _load(self, url: str) -> "Image.Image":
+        """Disk cache hit or fetch + decode + resize + store"""
+        # Pillow is imported on the first worker fetch, after the window is up
+        from PIL import Image
+
+        path = self._path_for(url)
+        if path and os.path.exists(path):
+            try:
+                with Image.open(path) as cached:
+                    image = cached.copy()
+                self.disk_hits += 1
+                return image
+            except OSError:
+                pass
+
+        data = self.fetcher(url)
+        with Image.open(io.BytesIO(data)) as source:
+            image = source.convert("RGB")
+        image.thumbnail(self.size, Image.LANCZOS)
+        self.fetched += 1
+
+        if path:
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                image.save(tmp_path, format="PNG")
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"⚠ Failed to write thumbnail cache: {e}")
+        return image
+
+    def __repr__(self) -> str:
+        return f"ThumbnailLoader(workers={self.workers}, photos={len(self._photos)}, fetched={self.fetched})"
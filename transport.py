@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Optional
+
+from resilience import UpstreamGuard
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_DIR = "data/fixtures"
+
+
+class FixtureMissing(KeyError):
+    """Raised in strict replay mode when no recording exists for a call"""
+
+
+class InjectedError(ConnectionError):
+    """Synthetic upstream failure raised by ReplayTransport"""
+
+
+class FixtureStore:
+    """Directory of recorded ytmusicapi responses, one JSON file per call"""
+
+    def __init__(self, path: str = FIXTURE_DIR):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def make_key(method: str, **params) -> str:
+        """Stable key for a call; search queries are whitespace/case normalized"""
+        if "query" in params and params["query"] is not None:
+            params["query"] = " ".join(str(params["query"]).lower().split())
+        return json.dumps({"method": method, "params": params}, sort_keys=True, ensure_ascii=False)
+
+    def _file_for(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, f"{digest}.json")
+
+    def save(self, key: str, response: Any):
+        path = self._file_for(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "response": response}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, key: str) -> Any:
+        path = self._file_for(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            raise FixtureMissing(key)
+        return data["response"]
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._file_for(key))
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.path) if name.endswith(".json"))
+
+
+class RecordingTransport:
+    """Pass calls through to a real backend and save every raw response"""
+
+    def __init__(self, store: FixtureStore, inner: Any = None):
+        if inner is None:
+            from ytmusicapi import YTMusic
+            inner = YTMusic()
+        self.inner = inner
+        self.store = store
+
+    def search(self, query: str, filter: Optional[str] = None, limit: int = 20):
+        if filter is None:
+            results = self.inner.search(query=query, limit=limit)
+        else:
+            results = self.inner.search(query=query, filter=filter, limit=limit)
+        self.store.save(FixtureStore.make_key("search", query=query, filter=filter, limit=limit), results)
+        return results
+
+    def get_song(self, video_id: str):
+        result = self.inner.get_song(video_id)
+        self.store.save(FixtureStore.make_key("get_song", video_id=video_id), result)
+        return result
+
+    def __repr__(self) -> str:
+        return f"RecordingTransport(path={self.store.path!r})"
+
+
+class ReplayTransport:
+    """Serve recorded responses offline, with optional latency/error injection"""
+
+    def __init__(
+        self,
+        store: FixtureStore,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        strict: bool = True
+    ):
+        """
+        Initialize replay backend
+
+        Args:
+            store: Fixture store to read from
+            latency: Fixed delay (seconds) added to every call
+            jitter: Extra uniform random delay in [0, jitter)
+            error_rate: Probability (0-1) of raising InjectedError
+            seed: Seed for the latency/error RNG (reproducible runs)
+            strict: Raise FixtureMissing for unrecorded calls instead of
+                returning an empty response
+        """
+        self.store = store
+        self.latency = max(0.0, latency)
+        self.jitter = max(0.0, jitter)
+        self.error_rate = min(max(0.0, error_rate), 1.0)
+        self.strict = strict
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _simulate(self, key: str):
+        """Apply injected latency and failures for one call"""
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise InjectedError(f"Injected failure for {key}")
+
+    def _load(self, key: str, empty: Any):
+        self._simulate(key)
+        try:
+            return self.store.load(key)
+        except FixtureMissing:
+            if self.strict:
+                raise
+            logger.warning(f"⚠ No fixture recorded for {key}")
+            return empty
+
+    def search(self, query: str, filter: Optional[str] = None, limit: int = 20):
+        return self._load(FixtureStore.make_key("search", query=query, filter=filter, limit=limit), [])
+
+    def get_song(self, video_id: str):
+        return self._load(FixtureStore.make_key("get_song", video_id=video_id), {})
+
+    def __repr__(self) -> str:
+        return (
+            f"ReplayTransport(path={self.store.path!r}, latency={self.latency}, "
+            f"error_rate={self.error_rate})"
+        )
+
+
+def transport_from_env() -> Optional[Any]:
+    """
+    Build a transport from environment variables (None = live YTMusic)
+
+    SMARTPLAYLIST_RECORD=<dir>   record live responses into <dir>
+    SMARTPLAYLIST_REPLAY=<dir>   replay responses from <dir>
+    SMARTPLAYLIST_REPLAY_LATENCY, _JITTER, _ERROR_RATE, _SEED tune replay
+    """
+    record_dir = os.environ.get("SMARTPLAYLIST_RECORD")
+    replay_dir = os.environ.get("SMARTPLAYLIST_REPLAY")
+
+    if replay_dir:
+        seed = os.environ.get("SMARTPLAYLIST_REPLAY_SEED")
+        transport = ReplayTransport(
+            FixtureStore(replay_dir),
+            latency=float(os.environ.get("SMARTPLAYLIST_REPLAY_LATENCY", 0) or 0),
+            jitter=float(os.environ.get("SMARTPLAYLIST_REPLAY_JITTER", 0) or 0),
+            error_rate=float(os.environ.get("SMARTPLAYLIST_REPLAY_ERROR_RATE", 0) or 0),
+            seed=int(seed) if seed else None
+        )
+        logger.info(f"✓ Using {transport!r}")
+        return transport
+
+    if record_dir:
+        transport = RecordingTransport(FixtureStore(record_dir))
+        logger.info(f"✓ Using {transport!r}")
+        return transport
+
+    return None
+
+
+def guard_for(transport: Optional[Any]) -> Optional[UpstreamGuard]:
+    """
+    Upstream guard suited to `transport` (None = YTMusicClient's default)
+
+    Replayed calls never reach YouTube Music, so they are not rate limited.
+    """
+    if isinstance(transport, ReplayTransport):
+        return UpstreamGuard.unlimited()
+    return None
@@ -1,7 +1,15 @@
-from ytmusicapi import YTMusic
-from typing import List, Optional
+from typing import Any, Callable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import logging
-from models import Track
+import threading
+import time
+import weakref
+import metrics
+from models import Track, format_duration, parse_duration
+from cache import SearchCache
+from local_index import LocalIndex
+from resilience import UpstreamGuard, UpstreamUnavailable
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -10,41 +18,110 @@ logger = logging.getLogger(__name__)
 class YTMusicClient:
     """Robust YouTube Music API wrapper"""
     
-    def __init__(self):
-        """Initialize client"""
+    def __init__(
+        self,
+        cache: Optional[SearchCache] = None,
+        client: Optional[Any] = None,
+        index: Optional[LocalIndex] = None,
+        guard: Optional[UpstreamGuard] = None
+    ):
+        """
+        Initialize client
+        
+        Args:
+            cache: Search cache (defaults to SearchCache in data/cache)
+            client: Backend exposing search()/get_song() like ytmusicapi.YTMusic,
+                e.g. a RecordingTransport or ReplayTransport (default: live YTMusic)
+            index: Local BM25 index fed with every parsed search result
+                (defaults to LocalIndex in data/cache)
+            guard: Rate limiter, retry policy and circuit breaker applied to
+                every upstream call (defaults to UpstreamGuard.from_env())
+        """
+        self.cache = cache if cache is not None else SearchCache()
+        self.index = index if index is not None else LocalIndex()
+        self.guard = guard if guard is not None else UpstreamGuard.from_env()
+        if client is not None:
+            self.client = client
+            logger.info(f"✓ YouTube Music client initialized with {client!r}")
+            return
         try:
+            from ytmusicapi import YTMusic
             self.client = YTMusic()
             logger.info("✓ YouTube Music client initialized")
         except Exception as e:
             logger.error(f"✗ Failed to initialize YTMusic: {e}")
             raise
 
-    def search_songs(self, query: str, limit: int = 20) -> List[Track]:
- 
+    def search_songs(
+        self,
+        query: str,
+        limit: int = 20,
+        use_cache: bool = True,
+        raise_errors: bool = False
+    ) -> List[Track]:
+        """
+        Search songs, served from cache when a fresh entry exists
+
+        If upstream fails, an expired cache entry is served when one is
+        kept; otherwise the result is empty, or with raise_errors the
+        upstream error is raised (UpstreamUnavailable for throttling, an
+        open circuit or exhausted retries).
+        """
+        if use_cache:
+            cached = self.cache.get(query, limit)
+            if cached is not None:
+                logger.info(f"✓ Cache hit: query='{query}', limit={limit} ({len(cached)} tracks)")
+                return cached
+
+        try:
+            tracks = self._search_uncached(query, limit)
+        except Exception as e:
+            logger.error(f"✗ Search failed: {e}")
+            return self._stale_fallback(query, limit, use_cache=use_cache, error=e if raise_errors else None)
+        
+        if use_cache:
+            self.cache.put(query, limit, tracks)
+
+        return tracks
+
+    def _stale_fallback(
+        self,
+        query: str,
+        limit: int,
+        kind: str = "",
+        use_cache: bool = True,
+        error: Optional[Exception] = None
+    ) -> List[Track]:
+        """Expired cache entry (if still kept) after a failed upstream search; else `error` is raised, or []"""
+        stale = self.cache.get(query, limit, kind=kind, allow_stale=True) if use_cache else None
+        if stale is None:
+            if error is not None:
+                raise error
+            return []
+        metrics.inc("stale_served_total", kind=kind or "search")
+        logger.warning(f"⚠ Upstream unavailable, serving stale cache: query='{query}' ({len(stale)} tracks)")
+        return stale
+
+    def _search_uncached(self, query: str, limit: int) -> List[Track]:
+        """
+        Query the API and parse results (no cache involved)
+        
+        Upstream failures (after the guard's retries) propagate to the
+        caller; malformed items are skipped.
+        """
         tracks: List[Track] = []
         
-        try:
-            # Clamp limit to API constraints
-            api_limit = max(1, min(limit, 100))  # YouTube Music API max is usually 20-100
-            
-            logger.info(f"Searching: query='{query}', limit={api_limit}")
-            
-            # Try with filter parameter
-            try:
-                results = self.client.search(
-                    query=query,
-                    filter="songs",
-                    limit=api_limit
-                )
-            except TypeError:
-                # Fallback for older versions
-                logger.warning("Filter parameter not supported, using fallback")
-                results = self.client.search(query=query, limit=api_limit)
-                results = [r for r in results if r.get("resultType") == "song"]
-            
-            logger.info(f"API returned {len(results)} results")
-            
-            # Parse results
+        # Clamp limit to API constraints
+        api_limit = max(1, min(limit, 100))  # YouTube Music API max is usually 20-100
+        
+        logger.info(f"Searching: query='{query}', limit={api_limit}")
+        
+        results = self._raw_search(query, api_limit)
+        
+        logger.info(f"API returned {len(results)} results")
+        
+        # Parse results
+        with metrics.span("parse"):
             for item in results:
                 try:
                     track = self._parse_track(item)
@@ -57,13 +134,131 @@ class YTMusicClient:
                             break
                             
                 except Exception as e:
+                    metrics.inc("parse_errors_total")
                     logger.warning(f"Failed to parse item: {e}")
                     continue
+        
+        logger.info(f"✓ Returning {len(tracks)} valid tracks (requested: {limit})")
+        
+        self.index.add_tracks(tracks, query)
+        
+        return tracks
+
+    def _raw_search(self, query: str, api_limit: int) -> list:
+        """Call backend search() for songs through the upstream guard"""
+        return self.guard.call("search", self._backend_search, query, api_limit)
+
+    def _backend_search(self, query: str, api_limit: int) -> list:
+        """One backend search() attempt for songs (raw result dicts)"""
+        metrics.inc("api_calls_total", op="search")
+        try:
+            with metrics.span("search_api"):
+                # Try with filter parameter
+                try:
+                    return self.client.search(
+                        query=query,
+                        filter="songs",
+                        limit=api_limit
+                    )
+                except TypeError:
+                    # Fallback for older versions
+                    logger.warning("Filter parameter not supported, using fallback")
+                    results = self.client.search(query=query, limit=api_limit)
+                    return [r for r in results if r.get("resultType") == "song"]
+        except Exception:
+            metrics.inc("api_errors_total", op="search")
+            raise
+
+    def search_songs_deep(
+        self,
+        query: str,
+        limit: int = 500,
+        page_size: int = 50,
+        max_pages: int = 40,
+        time_budget: float = 30.0,
+        use_cache: bool = True,
+        on_page: Optional[Callable[[List[Track]], None]] = None,
+        raise_errors: bool = False
+    ) -> List[Track]:
+        """
+        Search beyond the single-call ceiling in as few upstream calls as possible
+        
+        ytmusicapi follows continuation tokens internally up to the requested
+        limit, so one call asks for `limit` plus `page_size` headroom for
+        duplicates. Only if deduplication leaves fewer than `limit` tracks and
+        upstream had more, a top-up call doubles the request and just the new
+        tail is parsed; the total fetched stays linear in the result size.
+        Stops when `limit` unique tracks are collected, results run out, or
+        the call/time budget is spent. `on_page`, if given, receives the
+        unique tracks collected so far after every non-final call.
+        
+        A result cut short by a failed call or the time budget is returned
+        but not cached. If the first call fails and no stale entry is kept,
+        the result is empty, or with raise_errors the error is raised.
+        
+        Returns:
+            Up to `limit` unique tracks
+        """
+        if use_cache:
+            cached = self.cache.get(query, limit, kind="deep")
+            if cached is not None:
+                logger.info(f"✓ Cache hit (deep): query='{query}', limit={limit} ({len(cached)} tracks)")
+                return cached
+        
+        tracks: List[Track] = []
+        seen_ids = set()
+        raw_seen = 0
+        complete = True
+        request = limit + max(0, page_size)
+        deadline = time.monotonic() + max(0.0, time_budget)
+        
+        for page in range(1, max(1, max_pages) + 1):
+            if time.monotonic() >= deadline:
+                logger.warning(f"⚠ Deep search time budget spent after {page - 1} calls")
+                complete = False
+                break
             
-            logger.info(f"✓ Returning {len(tracks)} valid tracks (requested: {limit})")
+            try:
+                results = self._raw_search(query, request)
+            except Exception as e:
+                logger.error(f"✗ Deep search call {page} failed: {e}")
+                if not tracks:
+                    return self._stale_fallback(
+                        query, limit, kind="deep", use_cache=use_cache, error=e if raise_errors else None
+                    )
+                complete = False
+                break
             
-        except Exception as e:
-            logger.error(f"✗ Search failed: {e}")
+            new_items = results[raw_seen:]
+            raw_seen = len(results)
+            
+            with metrics.span("parse"):
+                for item in new_items:
+                    try:
+                        track = self._parse_track(item)
+                    except Exception as e:
+                        metrics.inc("parse_errors_total")
+                        logger.warning(f"Failed to parse item: {e}")
+                        continue
+                    if track and track.video_id and track.video_id not in seen_ids:
+                        seen_ids.add(track.video_id)
+                        tracks.append(track)
+            
+            logger.info(f"Deep search call {page} (limit={request}): {len(tracks)} unique tracks")
+            if len(tracks) >= limit or not new_items or raw_seen < request:
+                # Enough tracks, or upstream has nothing more to give
+                break
+            if on_page is not None:
+                on_page(list(tracks))
+            request *= 2
+        
+        tracks = tracks[:limit]
+        logger.info(f"✓ Deep search returning {len(tracks)} unique tracks (requested: {limit})")
+        
+        self.index.add_tracks(tracks, query)
+        
+        if use_cache and complete:
+            self.cache.put(query, limit, tracks, kind="deep")
         
         return tracks
 
@@ -84,10 +279,17 @@ class YTMusicClient:
             elif item.get("author"):
                 channel = item.get("author")
             
-            # Extract duration
+            # Extract duration (parsed to seconds once, here at ingest)
             duration = item.get("duration") or item.get("length") or "0:00"
             if not duration or duration == "None":
                 duration = "0:00"
+            seconds = item.get("duration_seconds") or item.get("lengthSeconds")
+            try:
+                seconds = int(seconds) if seconds is not None else parse_duration(duration)
+            except (TypeError, ValueError):
+                seconds = parse_duration(duration)
+            if duration == "0:00" and seconds > 0:
+                duration = format_duration(seconds)
             
             # Extract video ID - CRITICAL
             video_id = (
@@ -110,17 +312,15 @@ class YTMusicClient:
                 except (IndexError, AttributeError, TypeError):
                     pass
             
-            # Build URL
-            url = f"https://music.youtube.com/watch?v={video_id}"
-            
+            # URL is derived lazily from video_id by Track
             return Track(
                 title=title.strip(),
                 channel=channel.strip(),
                 duration=duration,
                 video_id=video_id,
                 thumbnail=thumbnail,
-                url=url,
-                result_type=item.get("resultType", "song")
+                result_type=item.get("resultType", "song"),
+                seconds=seconds
             )
             
         except Exception as e:
@@ -128,17 +328,129 @@ class YTMusicClient:
             return None
 
     def get_track_info(self, video_id: str) -> Optional[Track]:
-        """Get detailed track information"""
+        """
+        Get detailed track information (None if unknown)
+
+        Raises:
+            UpstreamUnavailable: Upstream throttled, down or failing
+        """
         try:
-            result = self.client.get_song(video_id)
+            result = self.guard.call("get_song", self._backend_get_song, video_id)
             if isinstance(result, dict):
                 video_details = result.get("videoDetails", {})
                 if video_details:
                     return self._parse_track(video_details)
             return None
+        except UpstreamUnavailable:
+            raise
         except Exception as e:
             logger.error(f"get_track_info failed: {e}")
             return None
 
+    def _backend_get_song(self, video_id: str) -> Any:
+        """One backend get_song() attempt"""
+        metrics.inc("api_calls_total", op="get_song")
+        try:
+            with metrics.span("get_song_api"):
+                return self.client.get_song(video_id)
+        except Exception:
+            metrics.inc("api_errors_total", op="get_song")
+            raise
+
+    def __repr__(self) -> str:
+        return "YTMusicClient(ready)"
+
+
+class AsyncYTMusicClient:
+    """asyncio front-end for YTMusicClient with a concurrency cap
+
+    ytmusicapi is blocking, so upstream calls run on one small shared
+    executor sized to ``max_concurrency``; any number of coroutines can
+    await searches while only that many threads exist. Cache lookups and
+    writes (disk I/O, JSON parsing) run on the loop's default executor,
+    outside the upstream cap, so they never block the event loop.
+    """
+
+    def __init__(self, client: Optional[YTMusicClient] = None, max_concurrency: int = 8):
+        """Initialize async client (wraps an existing YTMusicClient if given)"""
+        self.sync = client if client is not None else YTMusicClient()
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="ytm-async"
+        )
+        # One semaphore per event loop (asyncio primitives are loop-bound)
+        self._semaphores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._semaphores_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return self.sync.cache
+
+    def _limiter(self) -> "asyncio.Semaphore":
+        # asyncio is imported on first async use to keep startup light
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        with self._semaphores_lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _run(self, func, *args):
+        """Run a blocking call on the shared executor under the semaphore"""
+        import asyncio
+
+        async with self._limiter():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    @staticmethod
+    async def _offload(func, *args):
+        """Run local blocking work (disk cache, parsing) on the loop's default executor"""
+        import asyncio
+
+        return await asyncio.get_running_loop().run_in_executor(None, partial(func, *args))
+
+    async def search_songs(
+        self,
+        query: str,
+        limit: int = 20,
+        use_cache: bool = True,
+        raise_errors: bool = False
+    ) -> List[Track]:
+        """Async search_songs with the same semantics as YTMusicClient"""
+        if use_cache:
+            cached = await self._offload(self.sync.cache.get, query, limit)
+            if cached is not None:
+                logger.info(f"✓ Cache hit: query='{query}', limit={limit} ({len(cached)} tracks)")
+                return cached
+
+        try:
+            tracks = await self._run(self.sync._search_uncached, query, limit)
+        except Exception as e:
+            logger.error(f"✗ Search failed: {e}")
+            return await self._offload(
+                self.sync._stale_fallback, query, limit, "", use_cache, e if raise_errors else None
+            )
+
+        if use_cache:
+            await self._offload(self.sync.cache.put, query, limit, tracks)
+
+        return tracks
+
+    async def search_songs_deep(self, query: str, limit: int = 500, **kwargs) -> List[Track]:
+        """Async search_songs_deep (pages are fetched on the shared executor)"""
+        return await self._run(partial(self.sync.search_songs_deep, query, limit, **kwargs))
+
+    async def get_track_info(self, video_id: str) -> Optional[Track]:
+        """Async get_track_info"""
+        return await self._run(self.sync.get_track_info, video_id)
+
+    def close(self):
+        """Release executor threads"""
+        self._executor.shutdown(wait=False)
+
     def __repr__(self) -> str:
-        return "YTMusicClient(ready)"
\ No newline at end of file
+        return f"AsyncYTMusicClient(max_concurrency={self.max_concurrency})"